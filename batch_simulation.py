@@ -0,0 +1,525 @@
+import random
+import numpy as np
+from rng import GameRandom
+from config import *
+from maze import Maze, DIRECTIONS, MOVE_SETS
+from ghost import scatter_corner
+from simulation import Simulation, GHOST_COLORS, GHOST_MODES, DEFAULT_PACMAN_START, ghost_start_positions
+
+# Direction indices used in the state arrays. The first four follow the
+# bit order of Maze.DIRECTIONS so legal-move masks can be used directly.
+DIR_UP, DIR_DOWN, DIR_LEFT, DIR_RIGHT, DIR_STOP = range(5)
+ACTIONS = DIRECTIONS + (STOP,)
+DX = np.array([d[0] for d in ACTIONS])
+DY = np.array([d[1] for d in ACTIONS])
+REVERSE = np.array([DIR_DOWN, DIR_UP, DIR_RIGHT, DIR_LEFT, DIR_STOP])
+DIR_BITS = np.array([1, 2, 4, 8, 0])
+
+# Ghost target modes
+MODE_CHASE, MODE_SCATTER, MODE_RANDOM = range(3)
+MODE_IDS = {"chase": MODE_CHASE, "scatter": MODE_SCATTER, "random": MODE_RANDOM}
+
+# Lookups over 4-bit direction masks
+POPCOUNT = np.array([bin(mask).count("1") for mask in range(16)])
+FIRST_DIR = np.array([ACTIONS.index(moves[0]) if moves else DIR_STOP for moves in MOVE_SETS])
+
+NUM_GHOSTS = len(GHOST_COLORS)
+PACMAN_RADIUS = 12
+GHOST_RADIUS = 12
+HALF_CELL = CELL_SIZE // 2
+
+
+class BatchSimulation:
+    """N games stepped in lockstep, with all state held in NumPy arrays.
+
+    Reproduces the rules of Simulation (Pacman.update, Ghost.update and
+    check_collisions) with vectorised operations over every game at once.
+    Each game keeps its own seeded RNG, consumed in the same order as the
+    scalar engine, so a batch game and a Simulation with the same seed and
+    actions follow exactly the same trajectory (see check_parity).
+
+    Actions are direction indices (DIR_UP ... DIR_STOP), or -1 to keep the
+    queued direction. Games that reach GAME_OVER stay frozen until reset.
+
+    Each game has `num_ghosts` ghosts; beyond the first four they cycle
+    through the colours, modes and start cells like Simulation.add_ghost,
+    so one game with hundreds of ghosts is a ghost swarm (see swarm.py).
+    """
+
+    def __init__(self, num_games, seeds=None, num_ghosts=NUM_GHOSTS, layout=None):
+        assert 2 * max(PACMAN_RADIUS, GHOST_RADIUS) < CELL_SIZE, "entities may span at most two cells"
+        self.num_games = num_games
+        self.num_ghosts = num_ghosts
+
+        # Static maze tables shared by every game
+        self.maze = Maze(layout)
+        self.width = self.maze.width
+        self.height = self.maze.height
+        self.walkable = np.frombuffer(bytes(self.maze.walkable), dtype=np.uint8) != 0
+        self.move_masks = np.array([MOVE_SETS.index(moves) for moves in self.maze.legal_moves], dtype=np.int64)
+        self.pellet_template = np.frombuffer(bytes(self.maze.pellet_grid), dtype=np.uint8)
+        self.pellet_total = self.maze.pellets_remaining
+        self.distances = self.maze.distances()
+
+        self.pacman_start = self.maze.pacman_start or DEFAULT_PACMAN_START
+        starts = ghost_start_positions(self.maze)
+        starts = [starts[g % len(starts)] for g in range(num_ghosts)]
+        self.ghost_start_x = np.array([pos[0] for pos in starts])
+        self.ghost_start_y = np.array([pos[1] for pos in starts])
+        self.ghost_colors = [GHOST_COLORS[g % len(GHOST_COLORS)] for g in range(num_ghosts)]
+        corners = [scatter_corner(color, self.maze) for color in self.ghost_colors]
+        self.scatter_x = np.array([corner[0] for corner in corners])
+        self.scatter_y = np.array([corner[1] for corner in corners])
+        self.initial_modes = np.array([MODE_IDS[GHOST_MODES[g % len(GHOST_MODES)]] for g in range(num_ghosts)])
+
+        n, g = num_games, num_ghosts
+        self.rngs = [None] * n
+        self.state = np.full(n, PLAYING)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lives = np.zeros(n, dtype=np.int64)
+        self.level = np.zeros(n, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.power_pellet_timer = np.zeros(n, dtype=np.int64)
+        self.mode_timer = np.zeros(n, dtype=np.int64)
+        self.scatter_mode = np.zeros(n, dtype=bool)
+        self.pellets = np.zeros((n, self.width * self.height), dtype=np.uint8)
+        self.pellets_remaining = np.zeros(n, dtype=np.int64)
+
+        self.pacman_x = np.zeros(n)
+        self.pacman_y = np.zeros(n)
+        # Grid cells as (x, y) pairs, handed out by observe(); the _x and _y arrays are views of them
+        self.pacman_grid = np.zeros((n, 2), dtype=np.int64)
+        self.pacman_grid_x = self.pacman_grid[:, 0]
+        self.pacman_grid_y = self.pacman_grid[:, 1]
+        self.pacman_dir = np.zeros(n, dtype=np.int64)
+        self.pacman_next = np.zeros(n, dtype=np.int64)
+
+        self.ghost_x = np.zeros((n, g))
+        self.ghost_y = np.zeros((n, g))
+        self.ghost_grid = np.zeros((n, g, 2), dtype=np.int64)
+        self.ghost_grid_x = self.ghost_grid[:, :, 0]
+        self.ghost_grid_y = self.ghost_grid[:, :, 1]
+        self.ghost_dir = np.zeros((n, g), dtype=np.int64)
+        self.ghost_mode = np.zeros((n, g), dtype=np.int64)
+        self.ghost_speed = np.zeros(n)
+        self.frightened = np.zeros((n, g), dtype=bool)
+        self.frightened_timer = np.zeros((n, g), dtype=np.int64)
+        self.eaten = np.zeros((n, g), dtype=bool)
+
+        self.reset(seeds)
+
+    def reset(self, seeds=None, mask=None):
+        """Start fresh games, for every game or just those selected by mask.
+
+        `seeds` is None, a base int (game i gets base + i) or one seed per game.
+        """
+        mask = np.ones(self.num_games, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        if seeds is None or isinstance(seeds, int):
+            seeds = [None if seeds is None else seeds + i for i in range(self.num_games)]
+
+        for i in np.nonzero(mask)[0]:
+            rng = GameRandom(seeds[i])
+            self.rngs[i] = rng
+            # Same draws, in the same order, as Ghost.__init__
+            for g in range(self.num_ghosts):
+                self.ghost_dir[i, g] = rng.choice([DIR_UP, DIR_DOWN, DIR_LEFT, DIR_RIGHT])
+
+        self.state[mask] = PLAYING
+        self.score[mask] = 0
+        self.lives[mask] = 3
+        self.level[mask] = 1
+        self.ticks[mask] = 0
+        self.pellets[mask] = self.pellet_template
+        self.pellets_remaining[mask] = self.pellet_total
+        self.ghost_mode[mask] = self.initial_modes
+        self.ghost_speed[mask] = GHOST_SPEED
+        self._reset_positions(mask)
+        self._reset_timers(mask)
+        return self.observe()
+
+    def _reset_timers(self, mask):
+        self.power_pellet_timer[mask] = 0
+        self.mode_timer[mask] = 0
+        self.scatter_mode[mask] = True
+
+    def _reset_positions(self, mask):
+        """Put Pacman and the ghosts of the selected games back on their starts"""
+        start_x, start_y = self.pacman_start
+        self.pacman_grid_x[mask] = start_x
+        self.pacman_grid_y[mask] = start_y
+        self.pacman_x[mask] = start_x * CELL_SIZE + HALF_CELL
+        self.pacman_y[mask] = start_y * CELL_SIZE + HALF_CELL
+        self.pacman_dir[mask] = DIR_STOP
+        self.pacman_next[mask] = DIR_STOP
+
+        self.ghost_grid_x[mask] = self.ghost_start_x
+        self.ghost_grid_y[mask] = self.ghost_start_y
+        self.ghost_x[mask] = self.ghost_start_x * CELL_SIZE + HALF_CELL
+        self.ghost_y[mask] = self.ghost_start_y * CELL_SIZE + HALF_CELL
+        self.frightened[mask] = False
+        self.frightened_timer[mask] = 0
+        self.eaten[mask] = False
+
+    def step(self, actions):
+        """Advance every playing game by one tick.
+
+        Returns (observation, rewards, dones) where rewards are score gains.
+        """
+        actions = np.asarray(actions)
+        active = self.state == PLAYING
+        queued = active & (actions >= 0)
+        self.pacman_next[queued] = actions[queued]
+
+        score_before = self.score.copy()
+        self._update(active)
+        return self.observe(), self.score - score_before, self.state == GAME_OVER
+
+    def observe(self):
+        """Get the batched game state (arrays are live views, not copies)"""
+        return {
+            "pacman": self.pacman_grid,
+            "ghosts": self.ghost_grid,
+            "frightened": self.frightened,
+            "eaten": self.eaten,
+            "pellets": self.pellets.reshape(self.num_games, self.height, self.width),
+            "score": self.score,
+            "lives": self.lives,
+            "level": self.level,
+        }
+
+    def _update(self, active):
+        """Vectorised Simulation.update for the active games"""
+        self.ticks[active] += 1
+
+        # Scatter/chase mode timer
+        self.mode_timer[active] += 1
+        switch = active & (self.mode_timer >= MODE_TICKS)
+        self.scatter_mode[switch] = ~self.scatter_mode[switch]
+        self.mode_timer[switch] = 0
+        retarget = switch[:, None] & ~self.frightened & ~self.eaten
+        new_mode = np.where(self.scatter_mode, MODE_SCATTER, MODE_CHASE)[:, None]
+        self.ghost_mode = np.where(retarget, new_mode, self.ghost_mode)
+
+        # Power pellet timer
+        powered = active & (self.power_pellet_timer > 0)
+        self.power_pellet_timer[powered] -= 1
+        expired = powered & (self.power_pellet_timer <= 0)
+        self.frightened[expired] = False
+
+        self._update_pacman(active)
+        self._update_ghosts(active)
+        self._check_collisions(active)
+
+        cleared = active & (self.pellets_remaining == 0)
+        if cleared.any():
+            self._next_level(cleared)
+
+    def _cells_open(self, x, y):
+        """Walkability of grid cells, with everything off the grid blocked"""
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        index = np.clip(y, 0, self.height - 1) * self.width + np.clip(x, 0, self.width - 1)
+        return inside & self.walkable[index]
+
+    def _area_clear(self, x, y, radius):
+        """Vectorised Maze.is_area_clear for circles centred at (x, y)"""
+        left = np.floor_divide(x - radius, CELL_SIZE).astype(np.int64)
+        right = np.floor_divide(x + radius, CELL_SIZE).astype(np.int64)
+        top = np.floor_divide(y - radius, CELL_SIZE).astype(np.int64)
+        bottom = np.floor_divide(y + radius, CELL_SIZE).astype(np.int64)
+        return (self._cells_open(left, top) & self._cells_open(right, top) &
+                self._cells_open(left, bottom) & self._cells_open(right, bottom))
+
+    @staticmethod
+    def _near_center(x, y, grid_x, grid_y):
+        return ((np.abs(x - (grid_x * CELL_SIZE + HALF_CELL)) < MOVEMENT_THRESHOLD) &
+                (np.abs(y - (grid_y * CELL_SIZE + HALF_CELL)) < MOVEMENT_THRESHOLD))
+
+    def _wrap(self, x, mask, radius):
+        """Tunnel wrapping across the maze for the selected entities"""
+        maze_width = self.width * CELL_SIZE
+        x[mask & (x < -radius)] = maze_width + radius
+        x[mask & (x > maze_width + radius)] = -radius
+
+    def _update_pacman(self, active):
+        """Vectorised Pacman.update"""
+        x, y = self.pacman_x, self.pacman_y
+        grid_x, grid_y = self.pacman_grid_x, self.pacman_grid_y
+
+        # Take the queued direction when it leads somewhere valid
+        queued = self.pacman_next
+        test_x = np.floor_divide(x + DX[queued] * PACMAN_SPEED, CELL_SIZE).astype(np.int64)
+        test_y = np.floor_divide(y + DY[queued] * PACMAN_SPEED, CELL_SIZE).astype(np.int64)
+        turn = active & (queued != DIR_STOP) & self._cells_open(test_x, test_y)
+        turn &= self._near_center(x, y, grid_x, grid_y) | (self.pacman_dir == DIR_STOP)
+        self.pacman_dir[turn] = queued[turn]
+        self.pacman_next[turn] = DIR_STOP
+        x[turn] = grid_x[turn] * CELL_SIZE + HALF_CELL
+        y[turn] = grid_y[turn] * CELL_SIZE + HALF_CELL
+
+        # Move, or stop and snap when blocked
+        moving = active & (self.pacman_dir != DIR_STOP)
+        next_x = x + DX[self.pacman_dir] * PACMAN_SPEED
+        next_y = y + DY[self.pacman_dir] * PACMAN_SPEED
+        clear = self._area_clear(next_x, next_y, PACMAN_RADIUS)
+        moved = moving & clear
+        x[moved] = next_x[moved]
+        y[moved] = next_y[moved]
+        blocked = moving & ~clear
+        self.pacman_dir[blocked] = DIR_STOP
+        x[blocked] = grid_x[blocked] * CELL_SIZE + HALF_CELL
+        y[blocked] = grid_y[blocked] * CELL_SIZE + HALF_CELL
+
+        self._wrap(x, active, PACMAN_RADIUS)
+        grid_x[active] = np.floor_divide(x[active], CELL_SIZE)
+        grid_y[active] = np.floor_divide(y[active], CELL_SIZE)
+
+    def _possible_directions(self, grid_x, grid_y, direction):
+        """Vectorised Ghost._get_possible_directions, as direction bitmasks"""
+        inside = (grid_x >= 0) & (grid_x < self.width) & (grid_y >= 0) & (grid_y < self.height)
+        index = np.clip(grid_y, 0, self.height - 1) * self.width + np.clip(grid_x, 0, self.width - 1)
+        legal = np.where(inside, self.move_masks[index], 0)
+        # Reversing is only allowed when no earlier direction was legal
+        reverse_bit = DIR_BITS[REVERSE[direction]]
+        earlier = legal & (reverse_bit - 1)
+        return np.where((reverse_bit != 0) & (earlier != 0), legal & ~reverse_bit, legal)
+
+    def _update_ghosts(self, active):
+        """Vectorised Ghost.update for every ghost of the active games"""
+        playing = active[:, None]
+        returning = playing & self.eaten
+        self._return_ghosts(returning)
+        self._move_ghosts(playing & ~returning)
+
+        # Frightened countdown, in ticks
+        counting = playing & self.frightened
+        self.frightened_timer[counting] -= 1
+        self.frightened[counting & (self.frightened_timer <= 0)] = False
+
+    def _move_ghosts(self, mask):
+        """Vectorised Ghost._move"""
+        x, y = self.ghost_x, self.ghost_y
+        grid_x, grid_y = self.ghost_grid_x, self.ghost_grid_y
+        direction = self.ghost_dir
+
+        # Pick a direction at cell centres
+        near = mask & self._near_center(x, y, grid_x, grid_y)
+        possible = self._possible_directions(grid_x, grid_y, direction)
+        count = POPCOUNT[possible]
+        forced = near & (count == 1)
+        direction[forced] = FIRST_DIR[possible[forced]]
+        deciding = near & (count > 1)
+
+        randomly = deciding & (self.frightened | (self.ghost_mode == MODE_RANDOM))
+        for game, g in zip(*np.nonzero(randomly)):
+            options = possible[game, g]
+            if self.frightened[game, g]:
+                # Avoid reversing when frightened, if there is any other way
+                forward = options & ~DIR_BITS[REVERSE[direction[game, g]]]
+                options = forward or options
+            choices = [d for d in range(4) if options & (1 << d)]
+            direction[game, g] = self.rngs[game].choice(choices)
+
+        targeted = deciding & ~randomly
+        if targeted.any():
+            self._steer_to_targets(targeted, possible)
+
+        # Move, or take the first open direction when blocked
+        moving = mask & (direction != DIR_STOP)
+        speed = self.ghost_speed[:, None]
+        next_x = x + DX[direction] * speed
+        next_y = y + DY[direction] * speed
+        clear = self._area_clear(next_x, next_y, GHOST_RADIUS)
+        moved = moving & clear
+        x[moved] = next_x[moved]
+        y[moved] = next_y[moved]
+        blocked = moving & ~clear
+        if blocked.any():
+            retry = self._possible_directions(grid_x, grid_y, direction)
+            turn = blocked & (retry != 0)
+            direction[turn] = FIRST_DIR[retry[turn]]
+
+        self._wrap(x, mask, GHOST_RADIUS)
+        grid_x[mask] = np.floor_divide(x[mask], CELL_SIZE)
+        grid_y[mask] = np.floor_divide(y[mask], CELL_SIZE)
+
+    def _steer_to_targets(self, mask, possible):
+        """Vectorised Ghost._closest_direction for chasing and scattering ghosts"""
+        games, ghosts = np.nonzero(mask)
+        chasing = self.ghost_mode[games, ghosts] == MODE_CHASE
+        target_x = np.where(chasing, self.pacman_grid_x[games], self.scatter_x[ghosts])
+        target_y = np.where(chasing, self.pacman_grid_y[games], self.scatter_y[ghosts])
+
+        # Path distance from each neighbouring cell, one distance row per distinct target
+        grid_x = self.ghost_grid_x[games, ghosts][:, None]
+        grid_y = self.ghost_grid_y[games, ghosts][:, None]
+        neighbors = (grid_y + DY[:4]) * self.width + (grid_x + DX[:4])
+        neighbors = np.clip(neighbors, 0, self.width * self.height - 1)
+        distance = np.full(neighbors.shape, -1, dtype=np.int64)
+        targets, which = np.unique(np.stack([target_x, target_y], axis=1), axis=0, return_inverse=True)
+        which = which.reshape(-1)
+        for t, (tx, ty) in enumerate(targets):
+            row = np.frombuffer(self.distances.row(int(tx), int(ty)), dtype=np.intc)
+            rows = which == t
+            distance[rows] = row[neighbors[rows]]
+
+        # First possible direction with the smallest reachable distance
+        options = possible[games, ghosts]
+        allowed = (options[:, None] & DIR_BITS[:4]) != 0
+        reachable = allowed & (distance >= 0)
+        best = np.argmin(np.where(reachable, distance, np.iinfo(np.int64).max), axis=1)
+
+        # Targets beyond a bounded search: the closest in a straight line instead
+        far_x = grid_x + DX[:4] - target_x[:, None]
+        far_y = grid_y + DY[:4] - target_y[:, None]
+        straight = np.argmin(np.where(allowed, far_x * far_x + far_y * far_y, np.iinfo(np.int64).max), axis=1)
+        best = np.where(reachable.any(axis=1), best, np.where(allowed.any(axis=1), straight, FIRST_DIR[options]))
+        self.ghost_dir[games, ghosts] = best
+
+    def _return_ghosts(self, mask):
+        """Vectorised Ghost._return_to_start for eaten ghosts"""
+        target_x = self.ghost_start_x * CELL_SIZE + HALF_CELL
+        target_y = self.ghost_start_y * CELL_SIZE + HALF_CELL
+        dx = target_x - self.ghost_x
+        dy = target_y - self.ghost_y
+        distance = np.sqrt(dx**2 + dy**2)
+
+        home = mask & (distance < 5)
+        self.eaten[home] = False
+        self.ghost_x[home] = np.broadcast_to(target_x, home.shape)[home]
+        self.ghost_y[home] = np.broadcast_to(target_y, home.shape)[home]
+        self.ghost_grid_x[home] = np.broadcast_to(self.ghost_start_x, home.shape)[home]
+        self.ghost_grid_y[home] = np.broadcast_to(self.ghost_start_y, home.shape)[home]
+
+        travel = mask & ~home & (distance > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.ghost_x[travel] += ((dx / distance) * self.ghost_speed[:, None] * 2)[travel]
+            self.ghost_y[travel] += ((dy / distance) * self.ghost_speed[:, None] * 2)[travel]
+
+    def _check_collisions(self, active):
+        """Vectorised Simulation.check_collisions"""
+        grid_x = np.floor_divide(self.pacman_x, CELL_SIZE).astype(np.int64)
+        grid_y = np.floor_divide(self.pacman_y, CELL_SIZE).astype(np.int64)
+        inside = active & (grid_x >= 0) & (grid_x < self.width) & (grid_y >= 0) & (grid_y < self.height)
+        games = np.nonzero(inside)[0]
+        cells = grid_y[games] * self.width + grid_x[games]
+        kinds = self.pellets[games, cells]
+
+        # Pellets and power pellets
+        eaten = kinds != 0
+        self.pellets[games[eaten], cells[eaten]] = 0
+        self.pellets_remaining[games[eaten]] -= 1
+        self.score[games[kinds == 1]] += PELLET_SCORE
+        powered = games[kinds == 2]
+        self.score[powered] += POWER_PELLET_SCORE
+        self.power_pellet_timer[powered] = POWER_PELLET_TICKS
+        scared = np.zeros_like(self.frightened)
+        scared[powered] = True
+        scared &= ~self.eaten
+        self.frightened[scared] = True
+        self.frightened_timer[scared] = POWER_PELLET_TICKS
+
+        # Ghosts, all at once. Checks run in ghost order, so the ghosts after
+        # the first one that kills Pacman are tested again against the reset
+        # positions; repeat until no game has a death left.
+        reach = PACMAN_RADIUS + GHOST_RADIUS - 5
+        order = np.arange(self.num_ghosts)
+        checking = active
+        first = np.zeros(self.num_games, dtype=np.int64)
+        while True:
+            dx = self.pacman_x[:, None] - self.ghost_x
+            dy = self.pacman_y[:, None] - self.ghost_y
+            hit = checking[:, None] & (order >= first[:, None]) & (dx * dx + dy * dy < reach * reach)
+            dies = hit & ~self.frightened & ~self.eaten
+            died = dies.any(axis=1)
+            death = np.where(died, np.argmax(dies, axis=1), self.num_ghosts)
+            eat = hit & self.frightened & ~self.eaten & (order < death[:, None])
+            self.eaten[eat] = True
+            self.frightened[eat] = False
+            self.score += eat.sum(axis=1) * GHOST_SCORE
+            if not died.any():
+                break
+            self._pacman_dies(died)
+            checking = died
+            first = death + 1
+
+    def _pacman_dies(self, mask):
+        """Vectorised Simulation.pacman_dies"""
+        self.lives[mask] -= 1
+        over = mask & (self.lives <= 0)
+        self.state[over] = GAME_OVER
+        respawn = mask & ~over
+        self._reset_positions(respawn)
+        self.power_pellet_timer[respawn] = 0
+
+    def _next_level(self, mask):
+        """Vectorised Simulation.next_level"""
+        self.level[mask] += 1
+        self.score[mask] += BONUS_SCORE
+        self.pellets[mask] = self.pellet_template
+        self.pellets_remaining[mask] = self.pellet_total
+        self._reset_positions(mask)
+        self.ghost_speed[mask] = np.minimum(self.ghost_speed[mask] + 0.1, PACMAN_SPEED - 0.5)
+        self._reset_timers(mask)
+
+
+def _scalar_state(sim):
+    """Flatten a Simulation into the same tuple layout as _batch_state"""
+    pacman = sim.pacman
+    return (sim.state, sim.score, sim.lives, sim.level, sim.power_pellet_timer, sim.mode_timer,
+            sim.maze.pellets_remaining, pacman.pixel_x, pacman.pixel_y, ACTIONS.index(pacman.direction),
+            ACTIONS.index(pacman.next_direction),
+            tuple((ghost.pixel_x, ghost.pixel_y, ACTIONS.index(ghost.direction), MODE_IDS[ghost.target_mode],
+                   ghost.frightened, ghost.frightened_timer, ghost.eaten) for ghost in sim.ghosts))
+
+
+def _batch_state(batch, i):
+    return (batch.state[i], batch.score[i], batch.lives[i], batch.level[i], batch.power_pellet_timer[i],
+            batch.mode_timer[i], batch.pellets_remaining[i], batch.pacman_x[i], batch.pacman_y[i],
+            batch.pacman_dir[i], batch.pacman_next[i],
+            tuple((batch.ghost_x[i, g], batch.ghost_y[i, g], batch.ghost_dir[i, g], batch.ghost_mode[i, g],
+                   batch.frightened[i, g], batch.frightened_timer[i, g], batch.eaten[i, g])
+                  for g in range(batch.num_ghosts)))
+
+
+def check_parity(num_games=16, ticks=3000, seed=0, pellets_left=None, num_ghosts=NUM_GHOSTS, layout=None):
+    """Step a batch and matching scalar Simulations side by side.
+
+    Actions are random but shared. With `pellets_left`, every game starts
+    with only that many pellets so level changes are exercised too. Raises
+    AssertionError on the first tick where any game diverges.
+    """
+    batch = BatchSimulation(num_games, seeds=seed, num_ghosts=num_ghosts, layout=layout)
+    sims = [Simulation(seed + i, layout) for i in range(num_games)]
+    for sim in sims:
+        while len(sim.ghosts) < num_ghosts:
+            sim.add_ghost()
+    if pellets_left is not None:
+        # Keep the pellets closest to Pacman's start so games actually clear them
+        start = batch.maze.pacman_start
+        nearest = sorted(batch.maze.pellet_cells, key=lambda index: batch.distances.row(*start)[index])
+        for i, sim in enumerate(sims):
+            for index in nearest[pellets_left:]:
+                sim.maze.remove_pellet(index % sim.maze.width, index // sim.maze.width)
+                sim.maze.remove_power_pellet(index % sim.maze.width, index // sim.maze.width)
+            batch.pellets[i] = np.frombuffer(bytes(sim.maze.pellet_grid), dtype=np.uint8)
+            batch.pellets_remaining[i] = sim.maze.pellets_remaining
+
+    rng = random.Random(seed)
+    actions = np.full(num_games, -1)
+    for tick in range(ticks):
+        for i in range(num_games):
+            if rng.random() < 0.1:
+                actions[i] = rng.randrange(4)
+        batch.step(actions)
+        for i, sim in enumerate(sims):
+            sim.step(ACTIONS[actions[i]])
+            expected = _scalar_state(sim)
+            actual = _batch_state(batch, i)
+            assert expected == actual, f"game {i} diverged at tick {tick}:\n{expected}\n{actual}"
+
+
+if __name__ == "__main__":
+    check_parity()
+    check_parity(num_games=32, pellets_left=2, seed=100)
+    check_parity(num_games=2, ticks=2000, seed=200, num_ghosts=64)
+    print("Batch simulation matches the scalar engine")
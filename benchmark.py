@@ -0,0 +1,258 @@
+"""
+Benchmark suite for the game's hot paths.
+
+Runs fixed, seeded scenarios headlessly (SDL dummy video driver) and times
+the real code: whole simulation ticks, Pacman.update, Ghost.update,
+Simulation.check_collisions, Maze construction and an offscreen Game.draw,
+the slowest single tick (where new ghost path searches land),
+plus cold-start times of fresh interpreters importing the headless core and
+the game.
+Results are compared with a stored baseline, and the run fails if any of
+them is slower than the baseline by more than the configured tolerance.
+
+Usage: python benchmark.py            (compare against benchmark_baseline.json)
+       python benchmark.py --save     (record a new baseline on this machine)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Must be set before pygame opens a display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from maze import Maze, clear_template_cache
+from mazegen import generate_layout
+from profiler import Profiler
+from rollout import RandomPolicy
+from simulation import Simulation
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_TOLERANCE = 1.0  # Fail when a metric takes more than twice its baseline time
+SEED = 1234
+
+# Metrics, all in microseconds per call (lower is better)
+METRICS = ("tick_us", "worst_tick_us", "pacman_update_us", "ghost_update_us", "check_collisions_us",
+           "maze_build_us", "draw_us")
+# Metrics kept from the slowest run rather than the fastest, so repeats cannot hide a spike
+WORST_CASE_METRICS = ("worst_tick_us",)
+
+# Programs timed from a fresh interpreter, over and above an empty one. The core
+# must start without pygame, so that check is part of the program.
+COLD_START_PROGRAMS = {
+    "core_start_us": "import sys; from simulation import Simulation; Simulation(%d).step(); "
+                     "assert 'pygame' not in sys.modules, 'the simulation imported pygame'" % SEED,
+    "game_start_us": "import game",
+}
+
+
+def stock_scenario():
+    """The classic maze at the start of a game"""
+    return Simulation(SEED)
+
+
+def large_scenario():
+    """A generated 201x201 maze"""
+    return Simulation(SEED, layout=generate_layout(201, 201, SEED))
+
+
+def many_ghosts_scenario(count=64):
+    """The classic maze with many ghosts cycling through the four colours and modes"""
+    sim = Simulation(SEED)
+    while len(sim.ghosts) < count:
+        sim.add_ghost()
+    return sim
+
+
+def late_game_scenario(pellets_left=10):
+    """A late level with only the pellets furthest from Pacman left"""
+    sim = Simulation(SEED)
+    sim.level = 8
+    maze = sim.maze
+    row = maze.distances().row(*sim.pacman.get_grid_position())
+    by_distance = sorted(maze.iter_pellets(), key=lambda p: row[p[1] * maze.width + p[0]])
+    for x, y, _ in by_distance[:-pellets_left]:
+        maze.remove_pellet(x, y)
+        maze.remove_power_pellet(x, y)
+    return sim
+
+
+SCENARIOS = {
+    "stock": stock_scenario,
+    "large": large_scenario,
+    "many_ghosts": many_ghosts_scenario,
+    "late_game": late_game_scenario,
+}
+
+
+def _play(sim, policy, ticks, profiler=None):
+    """Step the simulation, timing each tick as a profiler frame if one is given"""
+    for _ in range(ticks):
+        if profiler is not None:
+            profiler.start_frame()
+        sim.step(policy(sim))
+        if profiler is not None:
+            profiler.end_frame()
+
+
+def run_scenario(name, ticks, frames, game):
+    """Time one scenario; returns {metric: microseconds}"""
+    sim = SCENARIOS[name]()
+    sim.lives = 10 ** 6  # Keep playing through every death
+    policy = RandomPolicy()
+    policy.reset(SEED)
+    _play(sim, policy, 100)  # Warm up caches (distance rows, sprites)
+
+    # Throughput of whole ticks, without any instrumentation
+    start = time.perf_counter()
+    _play(sim, policy, ticks)
+    tick_us = (time.perf_counter() - start) / ticks * 1e6
+
+    # The slowest single tick: a frame's budget must cover it, not just the average
+    worst_tick = 0.0
+    for _ in range(ticks):
+        start = time.perf_counter()
+        sim.step(policy(sim))
+        worst_tick = max(worst_tick, time.perf_counter() - start)
+
+    # Per-call latency of the update phases, from the frame profiler
+    sim.profiler = Profiler(frames=ticks, spans=1)
+    _play(sim, policy, ticks, sim.profiler)
+    phases = sim.profiler.percentiles(0.5)
+    sim.profiler = None
+
+    # Maze construction, parsing the layout each time rather than reusing the cached template
+    maze_times = []
+    for _ in range(max(5, frames // 5)):
+        clear_template_cache()
+        start = time.perf_counter()
+        Maze(sim.layout)
+        maze_times.append(time.perf_counter() - start)
+
+    # Offscreen rendering of the scenario's world
+    game.sim = game.world = sim  # The game draws its world, which is its simulation when not threaded
+    game.draw()  # Build the maze layers and sprites once
+    draw_times = []
+    for _ in range(frames):
+        sim.step(policy(sim))
+        start = time.perf_counter()
+        game.draw()
+        draw_times.append(time.perf_counter() - start)
+
+    return {
+        "tick_us": tick_us,
+        "worst_tick_us": worst_tick * 1e6,
+        "pacman_update_us": phases["pacman"][0] * 1000,
+        "ghost_update_us": phases["ghosts"][0] * 1000 / len(sim.ghosts),
+        "check_collisions_us": phases["collisions"][0] * 1000,
+        "maze_build_us": statistics.median(maze_times) * 1e6,
+        "draw_us": statistics.median(draw_times) * 1e6,
+    }
+
+
+def _start_time(program):
+    """Wall time of one fresh interpreter running a program"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", program], check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    return time.perf_counter() - start
+
+
+def measure_cold_start(repeat):
+    """Time the cold-start programs; returns {metric: microseconds}"""
+    repeat = max(3, repeat)
+    empty = min(_start_time("pass") for _ in range(repeat))
+    return {metric: (min(_start_time(program) for _ in range(repeat)) - empty) * 1e6
+            for metric, program in COLD_START_PROGRAMS.items()}
+
+
+def check_budgets(results, baseline, tolerance):
+    """List the metrics that are slower than baseline * (1 + tolerance)"""
+    failures = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if reference is not None and value > reference * (1 + tolerance):
+                failures.append(f"{name}.{metric}: {value:.1f} us (baseline {reference:.1f} us, "
+                                f"budget {reference * (1 + tolerance):.1f} us)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--ticks", type=int, default=3000, help="simulation ticks per measurement")
+    parser.add_argument("--frames", type=int, default=300, help="frames drawn per scenario")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per scenario; the fastest result of each metric is kept")
+    parser.add_argument("--quick", action="store_true",
+                        help="a short run (500 ticks, 60 frames); not compared with a full-length baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help=f"allowed slowdown over the baseline (default: the baseline's, "
+                             f"or {DEFAULT_TOLERANCE})")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+    if args.quick:
+        args.ticks, args.frames = 500, 60
+
+    from game import Game
+    game = Game(seed=SEED)
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        # Keep the best of several runs: noise from the rest of the system only ever adds time
+        runs = [run_scenario(name, args.ticks, args.frames, game) for _ in range(max(1, args.repeat))]
+        metrics = {metric: (max if metric in WORST_CASE_METRICS else min)(run[metric] for run in runs)
+                   for metric in METRICS}
+        results[name] = metrics
+        print(f"{name}: {1e6 / metrics['tick_us']:.0f} ticks/s, "
+              + ", ".join(f"{metric} {metrics[metric]:.1f}" for metric in METRICS))
+    results["cold_start"] = measure_cold_start(args.repeat)
+    print("cold_start: " + ", ".join(f"{metric} {value:.0f}" for metric, value in results["cold_start"].items()))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    tolerance = args.tolerance
+    if tolerance is None:
+        tolerance = baseline.get("tolerance", DEFAULT_TOLERANCE)
+
+    # Timings depend on run length (cache warm-up), so only like-for-like runs are compared
+    same_settings = baseline.get("ticks") == args.ticks and baseline.get("frames") == args.frames
+
+    if args.save:
+        scenarios = dict(baseline.get("scenarios", {})) if same_settings else {}
+        scenarios.update({name: {metric: round(value, 1) for metric, value in metrics.items()}
+                          for name, metrics in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump({"tolerance": tolerance, "ticks": args.ticks, "frames": args.frames,
+                       "scenarios": scenarios}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --save to record one")
+        return
+    if not same_settings:
+        print(f"Baseline was recorded with --ticks {baseline.get('ticks')} --frames "
+              f"{baseline.get('frames')}; not comparing against this run")
+        return
+    failures = check_budgets(results, baseline["scenarios"], tolerance)
+    if failures:
+        print(f"{len(failures)} metric(s) over budget:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"All metrics within {tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,9 +21,15 @@ PURPLE = (128, 0, 128)
 
 # Game settings
 FPS = 60
+TICK_SECONDS = 1 / FPS  # The simulation ticks at the original frame rate, whatever the rendering rate
+MAX_FRAME_SECONDS = 0.25  # Longer stalls are not caught up on
 PACMAN_SPEED = 4
 GHOST_SPEED = 3
 POWER_PELLET_DURATION = 8000  # milliseconds
+MODE_DURATION = 7000  # milliseconds between scatter and chase switches
+# The simulation advances in fixed ticks, so its timers count ticks, not wall time
+POWER_PELLET_TICKS = POWER_PELLET_DURATION * FPS // 1000
+MODE_TICKS = MODE_DURATION * FPS // 1000
 MOVEMENT_THRESHOLD = 2  # Pixels to consider "close enough" to grid center
 
 # Scoring
@@ -39,6 +45,11 @@ GAME_OVER = 2
 PAUSED = 3
 LEVEL_COMPLETE = 4
 
+# Ghost sprite states
+GHOST_NORMAL = 0
+GHOST_FRIGHTENED = 1
+GHOST_EATEN = 2
+
 # Directions
 UP = (0, -1)
 DOWN = (0, 1)
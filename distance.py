@@ -0,0 +1,140 @@
+from array import array
+from collections import OrderedDict, deque
+from config import *
+
+UNREACHABLE = -1
+MAX_CACHED_ROWS = 256     # Distance rows kept per layout (one row = one target cell)
+MAX_CACHED_CELLS = 1 << 22  # Total row cells kept per layout, which caps rows on big mazes
+MAX_CACHED_LAYOUTS = 8    # Distance fields kept per process
+MAX_SEARCH_CELLS = 2048  # A BFS stops after reaching this many cells, about a millisecond of work
+
+# Shared by every Maze (and therefore every Game) in the process, keyed by layout hash
+_fields = OrderedDict()
+
+
+def get_distance_field(maze):
+    """Get the shared distance field for a maze's layout, building it if needed"""
+    field = _fields.get(maze.layout_hash)
+    if field is None:
+        field = DistanceField(maze)
+        _fields[maze.layout_hash] = field
+        if len(_fields) > MAX_CACHED_LAYOUTS:
+            _fields.popitem(last=False)
+    else:
+        _fields.move_to_end(maze.layout_hash)
+    return field
+
+
+class DistanceField:
+    """All-pairs maze path distances, computed one BFS row at a time.
+
+    A row holds the distance from every cell to one target cell. Rows are
+    built lazily the first time a target is asked for and kept in an LRU so
+    memory stays bounded on large mazes. On very large mazes the search
+    stops after MAX_SEARCH_CELLS cells, and cells further from the target
+    are left UNREACHABLE, so a row costs the same on any maze size.
+    """
+
+    def __init__(self, maze, max_rows=None, max_search=MAX_SEARCH_CELLS):
+        self.width = maze.width
+        self.height = maze.height
+        self.walkable = bytes(maze.walkable)
+        if max_rows is None:
+            max_rows = max(16, min(MAX_CACHED_ROWS, MAX_CACHED_CELLS // (self.width * self.height)))
+        self.max_rows = max_rows
+        self.max_search = max_search
+        self._rows = OrderedDict()
+        self._snapped = {}
+
+        # Neighbour index offsets per cell, derived from the maze move table
+        offsets = {UP: -self.width, DOWN: self.width, LEFT: -1, RIGHT: 1}
+        offset_sets = {}
+        self._neighbors = []
+        for moves in maze.legal_moves:
+            neighbors = offset_sets.get(moves)
+            if neighbors is None:
+                neighbors = offset_sets[moves] = tuple(offsets[d] for d in moves)
+            self._neighbors.append(neighbors)
+
+    def row(self, x, y):
+        """Get the distances from every cell to the target cell (x, y).
+
+        Targets inside walls or outside the maze are snapped to the nearest
+        walkable cell. Unreachable cells hold UNREACHABLE.
+        """
+        target = self._snap(x, y)
+        row = self._rows.get(target)
+        if row is None:
+            row = self._bfs(target)
+            self._rows[target] = row
+            if len(self._rows) > self.max_rows:
+                self._rows.popitem(last=False)
+        else:
+            self._rows.move_to_end(target)
+        return row
+
+    def distance(self, x1, y1, x2, y2):
+        """Get the path distance between two cells"""
+        if not (0 <= x1 < self.width and 0 <= y1 < self.height):
+            return UNREACHABLE
+        return self.row(x2, y2)[y1 * self.width + x1]
+
+    def _bfs(self, target):
+        """Breadth-first search outwards from a target cell index"""
+        dist = array('i', [UNREACHABLE]) * (self.width * self.height)
+        if target is None:
+            return dist
+        neighbors = self._neighbors
+        dist[target] = 0
+        queue = deque([target])
+        reached = 1
+        while queue and reached < self.max_search:
+            index = queue.popleft()
+            next_dist = dist[index] + 1
+            for offset in neighbors[index]:
+                other = index + offset
+                if dist[other] == UNREACHABLE:
+                    dist[other] = next_dist
+                    queue.append(other)
+                    reached += 1
+        return dist
+
+    def _snap(self, x, y):
+        """Map a target cell to the index of the nearest walkable cell"""
+        if 0 <= x < self.width and 0 <= y < self.height and self.walkable[y * self.width + x]:
+            return y * self.width + x
+        if (x, y) not in self._snapped:
+            self._snapped[(x, y)] = self._ring_search(x, y)
+        return self._snapped[(x, y)]
+
+    def _ring_search(self, x, y):
+        """Search square rings outwards from (x, y) for the closest walkable cell.
+
+        Every cell on ring r is at least r away, so the search stops once r is
+        past the closest cell found. Ties go to the lowest cell index.
+        """
+        width, height = self.width, self.height
+        best = None
+        best_key = None
+        # From the first ring that touches the maze out to the one holding its farthest corner
+        r = max(0, -x, x - width + 1, -y, y - height + 1)
+        last = max(x, width - 1 - x, y, height - 1 - y)
+        while r <= last and (best_key is None or r * r <= best_key[0]):
+            left, right = max(0, x - r), min(width - 1, x + r)
+            top, bottom = max(0, y - r), min(height - 1, y + r)
+            cells = []
+            for cy in (y - r, y + r):
+                if 0 <= cy < height:
+                    cells.extend((cx, cy) for cx in range(left, right + 1))
+            for cx in (x - r, x + r):
+                if 0 <= cx < width:
+                    cells.extend((cx, cy) for cy in range(max(top, y - r + 1), min(bottom, y + r - 1) + 1))
+            for cx, cy in cells:
+                index = cy * width + cx
+                if self.walkable[index]:
+                    key = ((cx - x) ** 2 + (cy - y) ** 2, index)
+                    if best_key is None or key < best_key:
+                        best = index
+                        best_key = key
+            r += 1
+        return best
@@ -1,76 +1,200 @@
 import pygame
 import sys
-import math
+import time
+import numpy as np
 from config import *
-from maze import Maze
-from pacman import Pacman
-from ghost import Ghost
+from simulation import Simulation
+from swarm import SwarmSimulation, GhostSwarm
+from hud import Hud
+from profiler import Profiler
+from replay import ReplayRecorder, ReplayPlayer, KEYFRAME_INTERVAL
+from pipeline import FrameBuffer, FrameWorld, SimulationThread
 
-class Game:
+MAX_DIRTY_RECTS = 64  # More changed areas than this and a full redraw is cheaper
+
+def follow_camera(position, maze, view_size):
+    """World pixel position to show at a view's top-left so position stays centred on big mazes"""
+    camera = []
+    for pos, maze_size, size in ((position[0], maze.width, view_size[0]),
+                                 (position[1], maze.height, view_size[1])):
+        world_size = maze_size * CELL_SIZE
+        if world_size <= size:
+            camera.append(0)
+        else:
+            camera.append(min(max(int(pos) - size // 2, 0), world_size - size))
+    return tuple(camera)
+
+def draw_world(surface, sim, camera=(0, 0), profiler=None, motion=None):
+    """Draw the maze, Pacman and the ghosts in view (limited to the surface's clip area).
+    
+    With an Interpolation as `motion`, moving entities are drawn part-way
+    between their positions before and after the latest tick.
+    """
+    # Draw maze
+    sim.maze.draw(surface, camera)
+    if profiler is not None:
+        profiler.mark("maze")
+    
+    # Draw Pacman (shifting the offset moves the sprite by the opposite amount)
+    dx, dy = motion.pacman_shift(sim.pacman) if motion is not None else (0, 0)
+    sim.pacman.draw(surface, (camera[0] - dx, camera[1] - dy))
+    
+    # Draw the ghosts that are in view
+    view = surface.get_clip().move(camera).inflate(2 * CELL_SIZE, 2 * CELL_SIZE)
+    shifts = motion.ghost_shifts(sim.ghosts) if motion is not None else None
+    if isinstance(sim.ghosts, GhostSwarm):
+        sim.ghosts.draw(surface, camera, view, shifts)
+    else:
+        for i, ghost in enumerate(sim.ghosts):
+            if view.left < ghost.pixel_x < view.right and view.top < ghost.pixel_y < view.bottom:
+                if shifts is None:
+                    ghost.draw(surface, camera)
+                else:
+                    dx, dy = shifts[i]
+                    ghost.draw(surface, (camera[0] - dx, camera[1] - dy))
+    if profiler is not None:
+        profiler.mark("sprites")
+
+def merge_rects(rects):
+    """Rects covering the same area, with overlapping ones merged into their union"""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index >= 0:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+class Interpolation:
+    """Entity positions from before the latest tick, for drawing between ticks"""
+    
     def __init__(self):
-        print("Initializing pygame...")
+        self.alpha = 1.0  # Fraction of a tick elapsed since the latest one
+        self._pacman = None
+        self._ghosts = None
+    
+    def capture(self, sim):
+        """Remember where everything is; call right before each tick"""
+        self._pacman = (sim.pacman.pixel_x, sim.pacman.pixel_y)
+        if isinstance(sim.ghosts, GhostSwarm):
+            batch = sim.ghosts.batch
+            self._ghosts = (batch.ghost_x[0].copy(), batch.ghost_y[0].copy())
+        else:
+            self._ghosts = [(ghost.pixel_x, ghost.pixel_y) for ghost in sim.ghosts]
+    
+    def _shift(self, dx, dy):
+        """Part of the step back to the previous position still to be covered"""
+        if abs(dx) > CELL_SIZE or abs(dy) > CELL_SIZE:
+            return 0, 0  # A jump (tunnel, respawn or seek), not movement
+        back = 1.0 - self.alpha
+        return dx * back, dy * back
+    
+    def pacman_shift(self, pacman):
+        """(dx, dy) from Pacman's current position to where to draw it"""
+        if self._pacman is None:
+            return 0, 0
+        return self._shift(self._pacman[0] - pacman.pixel_x, self._pacman[1] - pacman.pixel_y)
+    
+    def ghost_shifts(self, ghosts):
+        """Per-ghost (dx, dy) like pacman_shift: a list, or two arrays for a swarm"""
+        if isinstance(ghosts, GhostSwarm):
+            batch = ghosts.batch
+            if self._ghosts is None or len(self._ghosts[0]) != len(ghosts):
+                return None
+            dx = self._ghosts[0] - batch.ghost_x[0]
+            dy = self._ghosts[1] - batch.ghost_y[0]
+            moved = (np.abs(dx) <= CELL_SIZE) & (np.abs(dy) <= CELL_SIZE)
+            back = 1.0 - self.alpha
+            return np.where(moved, dx * back, 0), np.where(moved, dy * back, 0)
+        if self._ghosts is None or len(self._ghosts) != len(ghosts):
+            return None
+        return [self._shift(x - ghost.pixel_x, y - ghost.pixel_y)
+                for (x, y), ghost in zip(self._ghosts, ghosts)]
+
+class Game:
+    def __init__(self, seed=None, record_path=None, replay_path=None, speed=1,
+                 dirty_rects=False, profile=False, trace_path=None, layout=None, swarm=None,
+                 threaded=False):
         pygame.init()
-        print("Creating display...")
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Pacman")
         self.clock = pygame.time.Clock()
-        print("Loading fonts...")
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
+        self.hud = Hud(self.font, self.small_font)
         
-        # Game state
-        self.state = PLAYING
-        self.score = 0
-        self.lives = 3
-        self.level = 1
-        
-        # Initialize game objects
-        print("Creating maze...")
-        self.maze = Maze()
-        print(f"Maze created. Pacman start: {self.maze.pacman_start}, Ghost starts: {len(self.maze.ghost_starts)}")
-        
-        # Ensure Pacman has a valid start position
-        if self.maze.pacman_start:
-            print(f"Creating Pacman at position {self.maze.pacman_start}")
-            self.pacman = Pacman(self.maze.pacman_start[0], self.maze.pacman_start[1], self.maze)
-        else:
-            # Default position if not found in maze
-            print("Using default Pacman position")
-            self.pacman = Pacman(9, 15, self.maze)
-        
-        # Create ghosts
-        self.ghosts = []
-        ghost_colors = [RED, PINK, CYAN, ORANGE]
-        ghost_modes = ["chase", "scatter", "chase", "random"]
-        
-        # Use ghost start positions from maze, or default positions
-        if self.maze.ghost_starts and len(self.maze.ghost_starts) >= 4:
-            ghost_positions = self.maze.ghost_starts[:4]
+        # Game world (maze, Pacman, ghosts and rules); swarm=N plays against N array-backed ghosts
+        if swarm:
+            self.sim = SwarmSimulation(seed, layout, swarm)
         else:
-            # Default positions in the ghost house area
-            ghost_positions = [(9, 9), (10, 9), (9, 10), (10, 10)]
-        
-        print(f"Creating {len(ghost_positions)} ghosts...")
-        for i, (color, mode) in enumerate(zip(ghost_colors, ghost_modes)):
-            if i < len(ghost_positions):
-                pos = ghost_positions[i]
-                print(f"Creating ghost {i+1} at position {pos}")
-                ghost = Ghost(pos[0], pos[1], color, self.maze, mode)
-                self.ghosts.append(ghost)
-        
-        print(f"Game initialization complete! {len(self.ghosts)} ghosts created.")
-        
-        # Power pellet timer
-        self.power_pellet_timer = 0
-        
-        # Game timing
-        self.mode_timer = 0
-        self.mode_duration = 7000  # 7 seconds
-        self.scatter_mode = True
-        
-        # Performance optimization
-        self.last_update_time = 0
-        self.update_interval = 16  # ~60 FPS
+            self.sim = Simulation(seed, layout)
+        
+        # World pixel position shown at the top-left of the screen; follows Pacman on big mazes
+        self.camera = (0, 0)
+        
+        # What gets drawn: the simulation itself, or with threaded=True a pipeline.FrameWorld
+        # copy of it while the simulation ticks on its own thread
+        self.threaded = threaded
+        self.world = self.sim
+        
+        # Direction pressed this frame, handed to the simulation on the next tick
+        self.action = None
+        
+        # Replay recording or playback
+        self.record_path = record_path
+        self.recorder = ReplayRecorder(self.sim) if record_path else None
+        self.player = ReplayPlayer.load(replay_path, self.sim) if replay_path else None
+        
+        # Simulated time per real second (10 fast-forwards 10x), and where entities were before the last tick
+        self.speed = speed
+        self.motion = Interpolation()
+        
+        # Dirty-rect mode repaints and pushes only the screen areas that changed
+        self.dirty_rects = dirty_rects
+        self._last_frame = None  # (maze, camera, sprite rects, HUD items) shown by the last frame
+        
+        # Frame-phase profiling (F3 toggles the timings overlay)
+        self.trace_path = trace_path
+        self.profiler = Profiler() if profile or trace_path else None
+        if not threaded:
+            # The profiler is not thread-safe, so a threaded simulation's ticks go untimed
+            self.sim.profiler = self.profiler
+        self.show_profile = profile
+    
+    # The world state lives on the simulation; expose it under the old names
+    @property
+    def maze(self):
+        return self.sim.maze
+    
+    @property
+    def pacman(self):
+        return self.sim.pacman
+    
+    @property
+    def ghosts(self):
+        return self.sim.ghosts
+    
+    @property
+    def score(self):
+        return self.sim.score
+    
+    @property
+    def lives(self):
+        return self.sim.lives
+    
+    @property
+    def level(self):
+        return self.sim.level
+    
+    @property
+    def state(self):
+        return self.sim.state
+    
+    @state.setter
+    def state(self, value):
+        self.sim.state = value
     
     def handle_events(self):
         """Handle pygame events"""
@@ -88,278 +212,255 @@ class Game:
                         self.state = PLAYING
                 elif event.key == pygame.K_r and self.state == GAME_OVER:
                     self.reset_game()
+                elif event.key == pygame.K_F3 and self.profiler is not None:
+                    self.show_profile = not self.show_profile
+                
+                # Seek through replays 10 seconds at a time
+                elif self.player is not None and event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    offset = KEYFRAME_INTERVAL if event.key == pygame.K_RIGHT else -KEYFRAME_INTERVAL
+                    self.player.seek(self.player.tick + offset)
                 
                 # Handle movement on key press for immediate response
                 elif self.state == PLAYING:
                     if event.key == pygame.K_UP or event.key == pygame.K_w:
-                        self.pacman.set_direction(UP)
+                        self.action = UP
                     elif event.key == pygame.K_DOWN or event.key == pygame.K_s:
-                        self.pacman.set_direction(DOWN)
+                        self.action = DOWN
                     elif event.key == pygame.K_LEFT or event.key == pygame.K_a:
-                        self.pacman.set_direction(LEFT)
+                        self.action = LEFT
                     elif event.key == pygame.K_RIGHT or event.key == pygame.K_d:
-                        self.pacman.set_direction(RIGHT)
+                        self.action = RIGHT
         
         # Also handle continuous key presses for smoother movement
         if self.state == PLAYING:
             keys = pygame.key.get_pressed()
             if keys[pygame.K_UP] or keys[pygame.K_w]:
-                self.pacman.set_direction(UP)
+                self.action = UP
             elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
-                self.pacman.set_direction(DOWN)
+                self.action = DOWN
             elif keys[pygame.K_LEFT] or keys[pygame.K_a]:
-                self.pacman.set_direction(LEFT)
+                self.action = LEFT
             elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-                self.pacman.set_direction(RIGHT)
+                self.action = RIGHT
         
         return True
     
     def update(self):
-        """Update game logic"""
+        """Advance the simulation by one fixed tick"""
         if self.state != PLAYING:
             return
         
-        # Update mode timer for ghost behavior
-        self.mode_timer += self.clock.get_time()
-        if self.mode_timer >= self.mode_duration:
-            self.scatter_mode = not self.scatter_mode
-            self.mode_timer = 0
-            # Update ghost modes
-            for ghost in self.ghosts:
-                if not ghost.frightened and not ghost.eaten:
-                    ghost.target_mode = "scatter" if self.scatter_mode else "chase"
-        
-        # Update power pellet timer
-        if self.power_pellet_timer > 0:
-            self.power_pellet_timer -= self.clock.get_time()
-            if self.power_pellet_timer <= 0:
-                # End frightened mode for all ghosts
-                for ghost in self.ghosts:
-                    ghost.frightened = False
-        
-        # Update Pacman
-        self.pacman.update()
-        
-        # Update ghosts
-        pacman_pos = self.pacman.get_grid_position()
-        for ghost in self.ghosts:
-            ghost.update(pacman_pos)
-        
-        # Check collisions
-        self.check_collisions()
-        
-        # Check win condition
-        if self.maze.all_pellets_eaten():
-            self.next_level()
-    
-    def check_collisions(self):
-        """Check for collisions between game objects"""
-        # Get Pacman's grid position for more accurate collision detection
-        pacman_grid_x = int(self.pacman.pixel_x // CELL_SIZE)
-        pacman_grid_y = int(self.pacman.pixel_y // CELL_SIZE)
-        
-        # Check pellet collisions (more precise)
-        for pellet in self.maze.pellets[:]:  # Use slice to avoid modification during iteration
-            pellet_grid_x = int(pellet.x // CELL_SIZE)
-            pellet_grid_y = int(pellet.y // CELL_SIZE)
-            
-            # Check if Pacman is in the same grid cell as pellet
-            if (pacman_grid_x == pellet_grid_x and pacman_grid_y == pellet_grid_y):
-                self.score += self.maze.remove_pellet(pellet)
-        
-        # Check power pellet collisions
-        for power_pellet in self.maze.power_pellets[:]:
-            power_pellet_grid_x = int(power_pellet.x // CELL_SIZE)
-            power_pellet_grid_y = int(power_pellet.y // CELL_SIZE)
-            
-            if (pacman_grid_x == power_pellet_grid_x and pacman_grid_y == power_pellet_grid_y):
-                self.score += self.maze.remove_power_pellet(power_pellet)
-                # Activate power mode
-                self.power_pellet_timer = POWER_PELLET_DURATION
-                for ghost in self.ghosts:
-                    if not ghost.eaten:
-                        ghost.set_frightened(POWER_PELLET_DURATION // 16)  # Convert to frames
-        
-        # Check ghost collisions with distance-based detection
-        for ghost in self.ghosts:
-            distance = math.sqrt((self.pacman.pixel_x - ghost.pixel_x)**2 + 
-                               (self.pacman.pixel_y - ghost.pixel_y)**2)
-            
-            if distance < (self.pacman.radius + ghost.radius - 5):  # Slight overlap tolerance
-                if ghost.frightened and not ghost.eaten:
-                    # Eat the ghost
-                    ghost.eat()
-                    self.score += GHOST_SCORE
-                elif not ghost.eaten:
-                    # Pacman dies
-                    self.pacman_dies()
-    
-    def pacman_dies(self):
-        """Handle Pacman death"""
-        self.lives -= 1
-        if self.lives <= 0:
-            self.state = GAME_OVER
-        else:
-            # Reset positions
-            self.pacman.reset_position()
-            for ghost in self.ghosts:
-                ghost.reset_position()
-            self.power_pellet_timer = 0
-    
-    def next_level(self):
-        """Advance to next level"""
-        self.level += 1
-        self.score += BONUS_SCORE
-        
-        # Reset maze and positions
-        self.maze = Maze()
-        self.pacman.maze = self.maze
-        if self.maze.pacman_start:
-            self.pacman.grid_x, self.pacman.grid_y = self.maze.pacman_start
-            self.pacman.pixel_x = self.pacman.grid_x * CELL_SIZE + CELL_SIZE // 2
-            self.pacman.pixel_y = self.pacman.grid_y * CELL_SIZE + CELL_SIZE // 2
-        self.pacman.reset_position()
-        
-        # Reset ghosts with new positions
-        ghost_positions = self.maze.ghost_starts[:4] if self.maze.ghost_starts and len(self.maze.ghost_starts) >= 4 else [(9, 9), (10, 9), (9, 10), (10, 10)]
-        for i, ghost in enumerate(self.ghosts):
-            ghost.maze = self.maze
-            if i < len(ghost_positions):
-                ghost.start_x, ghost.start_y = ghost_positions[i]
-            ghost.reset_position()
-            # Increase ghost speed slightly
-            ghost.speed = min(ghost.speed + 0.1, PACMAN_SPEED - 0.5)
+        self.motion.capture(self.sim)
+        if self.player is not None:
+            # Replays ignore the keyboard
+            self.player.step()
+            return
         
-        self.power_pellet_timer = 0
-        self.mode_timer = 0
-        self.scatter_mode = True
+        if self.recorder is not None:
+            self.recorder.record(self.sim, self.action)
+        self.sim.step(self.action)
+        self.action = None
     
     def reset_game(self):
         """Reset the entire game"""
-        self.score = 0
-        self.lives = 3
-        self.level = 1
-        self.state = PLAYING
-        
-        # Reset maze and positions
-        self.maze = Maze()
-        self.pacman.maze = self.maze
-        if self.maze.pacman_start:
-            self.pacman.grid_x, self.pacman.grid_y = self.maze.pacman_start
-            self.pacman.pixel_x = self.pacman.grid_x * CELL_SIZE + CELL_SIZE // 2
-            self.pacman.pixel_y = self.pacman.grid_y * CELL_SIZE + CELL_SIZE // 2
-        self.pacman.reset_position()
-        
-        # Reset ghosts with new positions
-        ghost_positions = self.maze.ghost_starts[:4] if self.maze.ghost_starts and len(self.maze.ghost_starts) >= 4 else [(9, 9), (10, 9), (9, 10), (10, 10)]
-        for i, ghost in enumerate(self.ghosts):
-            ghost.maze = self.maze
-            if i < len(ghost_positions):
-                ghost.start_x, ghost.start_y = ghost_positions[i]
-            ghost.reset_position()
-            ghost.speed = GHOST_SPEED
-        
-        self.power_pellet_timer = 0
-        self.mode_timer = 0
-        self.scatter_mode = True
+        if self.player is not None:
+            self.player.seek(0)
+            return
+        self.sim.reset()
+        if self.recorder is not None:
+            # A new game starts a new recording
+            self.recorder = ReplayRecorder(self.sim)
     
-    def draw(self):
-        """Draw everything on screen"""
-        self.screen.fill(BLACK)
-        
-        # Draw maze
-        self.maze.draw(self.screen)
-        
-        # Draw Pacman
-        self.pacman.draw(self.screen)
-        
-        # Draw ghosts
-        for ghost in self.ghosts:
-            ghost.draw(self.screen)
+    def draw(self, alpha=1.0):
+        """Draw everything on screen, alpha of a tick after the latest one"""
+        self.motion.alpha = alpha
+        self._follow_pacman()
+        world = self.world
+        if self.dirty_rects and world.state == PLAYING and self._draw_dirty():
+            return
         
-        # Draw UI
-        self.draw_ui()
+        self._draw_scene()
         
         # Draw game state overlays
-        if self.state == PAUSED:
-            self.draw_pause_screen()
-        elif self.state == GAME_OVER:
-            self.draw_game_over_screen()
+        if world.state == PAUSED:
+            self.hud.draw_pause(self.screen)
+        elif world.state == GAME_OVER:
+            self.hud.draw_game_over(self.screen, world.score)
+        if self.profiler is not None:
+            self.profiler.mark("ui")
         
         pygame.display.flip()
+        if self.profiler is not None:
+            self.profiler.mark("flip")
+        if self.dirty_rects:
+            # Overlays cover the whole screen, so only a playing frame can be patched; nor can
+            # one with more sprites than dirty rects allowed (a big swarm), so skip their rects
+            patchable = world.state == PLAYING and len(world.ghosts) < MAX_DIRTY_RECTS
+            self._last_frame = self._frame_contents() if patchable else None
     
-    def draw_ui(self):
-        """Draw user interface elements"""
-        # Score
-        score_text = self.font.render(f"Score: {self.score}", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
-        
-        # Lives
-        lives_text = self.font.render(f"Lives: {self.lives}", True, WHITE)
-        self.screen.blit(lives_text, (10, 50))
-        
-        # Level
-        level_text = self.font.render(f"Level: {self.level}", True, WHITE)
-        self.screen.blit(level_text, (10, 90))
-        
-        # Power pellet indicator
-        if self.power_pellet_timer > 0:
-            power_text = self.small_font.render("POWER MODE!", True, YELLOW)
-            self.screen.blit(power_text, (SCREEN_WIDTH - 120, 10))
+    def _follow_pacman(self):
+        """Scroll the camera to keep Pacman centred on mazes bigger than the screen"""
+        pacman = self.world.pacman
+        motion = self._motion()
+        dx, dy = motion.pacman_shift(pacman) if motion is not None else (0, 0)
+        self.camera = follow_camera((pacman.pixel_x + dx, pacman.pixel_y + dy), self.world.maze,
+                                    (SCREEN_WIDTH, SCREEN_HEIGHT))
     
-    def draw_pause_screen(self):
-        """Draw pause screen overlay"""
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
-        
-        pause_text = self.font.render("PAUSED", True, WHITE)
-        text_rect = pause_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
-        self.screen.blit(pause_text, text_rect)
-        
-        continue_text = self.small_font.render("Press SPACE to continue", True, WHITE)
-        continue_rect = continue_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 40))
-        self.screen.blit(continue_text, continue_rect)
+    def _motion(self):
+        """The interpolation to draw with, or None to draw the latest tick as it is"""
+        # Dirty-rect frames repaint where sprites are, not where they are drawn between ticks
+        if self.dirty_rects or self.world.state != PLAYING or self.motion.alpha >= 1.0:
+            return None
+        return self.motion
     
-    def draw_game_over_screen(self):
-        """Draw game over screen overlay"""
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(128)
-        overlay.fill(BLACK)
-        self.screen.blit(overlay, (0, 0))
-        
-        game_over_text = self.font.render("GAME OVER", True, RED)
-        text_rect = game_over_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 20))
-        self.screen.blit(game_over_text, text_rect)
-        
-        score_text = self.font.render(f"Final Score: {self.score}", True, WHITE)
-        score_rect = score_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 20))
-        self.screen.blit(score_text, score_rect)
+    def _draw_scene(self):
+        """Draw the maze, Pacman, ghosts and UI (limited to the screen's clip area, if set)"""
+        self.screen.fill(BLACK)
+        draw_world(self.screen, self.world, self.camera, self.profiler, self._motion())
         
-        restart_text = self.small_font.render("Press R to restart or ESC to quit", True, WHITE)
-        restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 60))
-        self.screen.blit(restart_text, restart_rect)
+        # Draw UI
+        self.screen.blits(self._ui_items(), doreturn=False)
+        if self.profiler is not None:
+            self.profiler.mark("ui")
+    
+    def _ui_items(self):
+        """HUD labels, plus the profiler timings when shown, as (surface, position) pairs"""
+        items = self.hud.items(self.world)
+        if self.show_profile:
+            items += self.hud.profile_items(self.profiler)
+        return items
+    
+    def _frame_contents(self):
+        """What a frame shows, for working out what the next one changes"""
+        world = self.world
+        if isinstance(world.ghosts, GhostSwarm):
+            ghost_rects = world.ghosts.sprite_rects()
+        else:
+            ghost_rects = [ghost.sprite_rect() for ghost in world.ghosts]
+        sprites = [world.pacman.sprite_rect()] + ghost_rects
+        return world.maze, self.camera, sprites, set(self._ui_items())
+    
+    def _draw_dirty(self):
+        """Repaint and push only what changed since the last frame.
+        
+        Returns False when the whole screen has to be redrawn instead.
+        """
+        if self._last_frame is None:
+            return False
+        maze = self.world.maze
+        last_maze, last_camera, last_sprites, last_hud = self._last_frame
+        if last_maze is not maze or last_camera != self.camera:
+            return False
+        dirty = maze.take_dirty_rects()  # Eaten pellets
+        if dirty is None:
+            return False
+        
+        frame = self._frame_contents()
+        _, camera, sprites, hud = frame
+        if len(sprites) != len(last_sprites):
+            return False
+        # Where each sprite was and is now, and labels that appeared, changed or went away
+        dirty.extend(old.union(new) for old, new in zip(last_sprites, sprites))
+        dirty = [rect.move(-camera[0], -camera[1]) for rect in dirty]
+        dirty.extend(pygame.Rect(pos, text.get_size()) for text, pos in hud ^ last_hud)
+        if len(dirty) > MAX_DIRTY_RECTS:
+            return False
+        dirty = merge_rects(dirty)
+        
+        # Repaint each area: the maze under it, the sprites in it and the labels over it
+        screen = self.screen
+        labels = list(hud)
+        label_rects = [pygame.Rect(pos, text.get_size()) for text, pos in labels]
+        for rect in dirty:
+            screen.set_clip(rect)
+            screen.fill(BLACK, rect)
+            draw_world(screen, self.world, camera)
+            screen.blits([labels[i] for i in rect.collidelistall(label_rects)], doreturn=False)
+        screen.set_clip(None)
+        if self.profiler is not None:
+            self.profiler.mark("sprites")
+        
+        pygame.display.update(dirty)
+        if self.profiler is not None:
+            self.profiler.mark("flip")
+        self._last_frame = frame
+        return True
     
     def run(self):
         """Main game loop"""
+        if self.threaded:
+            self._run_pipelined()
+        else:
+            self._run_loop()
+        
+        if self.recorder is not None:
+            self.recorder.save(self.record_path)
+            print(f"Replay saved to {self.record_path}")
+        if self.trace_path is not None:
+            self.profiler.write_trace(self.trace_path)
+            print(f"Profile trace saved to {self.trace_path}")
+        
+        pygame.quit()
+        sys.exit()
+    
+    def _run_loop(self):
+        """Tick and draw in turn until the window is closed"""
         running = True
-        last_time = pygame.time.get_ticks()
+        profiler = self.profiler
+        # Real time owed to the simulation, times the speed; whole ticks are run as it builds up
+        accumulator = 0.0
+        last_time = time.perf_counter()
         
         while running:
-            current_time = pygame.time.get_ticks()
-            dt = current_time - last_time
+            current_time = time.perf_counter()
+            accumulator += min(current_time - last_time, MAX_FRAME_SECONDS) * self.speed
             last_time = current_time
             
-            # Cap delta time to prevent large jumps
-            dt = min(dt, 50)  # Maximum 50ms per frame
-            
+            if profiler is not None:
+                profiler.start_frame()
             running = self.handle_events()
-            self.update()
+            if profiler is not None:
+                profiler.mark("events")
+            while accumulator >= TICK_SECONDS:
+                self.update()
+                accumulator -= TICK_SECONDS
+            if profiler is not None:
+                profiler.mark("update")
+            # Draw the part of the next tick that has already elapsed
+            self.draw(accumulator / TICK_SECONDS)
+            if profiler is not None:
+                profiler.end_frame()
+            
+            # Render at the display rate; the simulation keeps its own pace
+            self.clock.tick(FPS)
+    
+    def _run_pipelined(self):
+        """Draw frame snapshots while a SimulationThread ticks, until the window is closed"""
+        running = True
+        profiler = self.profiler
+        buffer = FrameBuffer()
+        worker = SimulationThread(self, buffer)
+        self.world = FrameWorld(self.sim)
+        worker.start()
+        
+        while running:
+            if profiler is not None:
+                profiler.start_frame()
+            # Input changes the simulation, so it waits for the current batch of ticks
+            with worker.lock:
+                running = self.handle_events()
+            if profiler is not None:
+                profiler.mark("events")
+            frame = buffer.take()
+            if frame is not None:
+                self.world.apply(frame)
+            if profiler is not None:
+                profiler.mark("update")
             self.draw()
+            if profiler is not None:
+                profiler.end_frame()
             
-            # More consistent frame rate
             self.clock.tick(FPS)
         
-        pygame.quit()
-        sys.exit()
+        worker.stop()
+        self.world = self.sim
@@ -1,11 +1,35 @@
-import pygame
 import random
 import math
+from operator import attrgetter
 from config import *
+import sprites  # Drawing only; sprites loads pygame on first draw
+
+# Attributes that make up a ghost's state in a simulation snapshot
+STATE_FIELDS = ("start_x", "start_y", "pixel_x", "pixel_y", "grid_x", "grid_y", "direction",
+                "target_mode", "speed", "frightened", "frightened_timer", "eaten")
+_get_state = attrgetter(*STATE_FIELDS)
+
+
+def scatter_corner(color, maze):
+    """Get the corner cell a ghost of the given color scatters to"""
+    # Target corners based on ghost color
+    right = maze.width - 1
+    bottom = maze.height - 1
+    if color == RED:
+        return (0, 0)  # Top-left
+    elif color == PINK:
+        return (right, 0)  # Top-right
+    elif color == CYAN:
+        return (0, bottom)  # Bottom-left
+    else:
+        return (right, bottom)  # Bottom-right
 
 class Ghost:
-    def __init__(self, x, y, color, maze, target_mode="random"):
+    __slots__ = ("maze", "rng", "color", "radius") + STATE_FIELDS
+    
+    def __init__(self, x, y, color, maze, target_mode="random", rng=None):
         self.maze = maze
+        self.rng = rng if rng is not None else random
         self.start_x = x
         self.start_y = y
         self.grid_x = x
@@ -13,15 +37,13 @@ class Ghost:
         self.pixel_x = x * CELL_SIZE + CELL_SIZE // 2
         self.pixel_y = y * CELL_SIZE + CELL_SIZE // 2
         self.color = color
-        self.direction = random.choice([UP, DOWN, LEFT, RIGHT])
+        self.direction = self.rng.choice([UP, DOWN, LEFT, RIGHT])
         self.speed = GHOST_SPEED
         self.radius = 12
         self.target_mode = target_mode
         self.frightened = False
         self.frightened_timer = 0
         self.eaten = False
-        self.rect = pygame.Rect(self.pixel_x - self.radius, self.pixel_y - self.radius,
-                               self.radius * 2, self.radius * 2)
     
     def update(self, pacman_pos):
         """Update ghost position and AI"""
@@ -37,9 +59,6 @@ class Ghost:
             self.frightened_timer -= 1
             if self.frightened_timer <= 0:
                 self.frightened = False
-        
-        # Update rectangle for collision detection
-        self.rect.center = (self.pixel_x, self.pixel_y)
     
     def _move(self, pacman_pos):
         """Move the ghost based on AI behavior"""
@@ -52,9 +71,9 @@ class Ghost:
                     # Random movement when frightened, but avoid reversing
                     available = [d for d in possible_directions if d != (-self.direction[0], -self.direction[1])]
                     if available:
-                        self.direction = random.choice(available)
+                        self.direction = self.rng.choice(available)
                     else:
-                        self.direction = random.choice(possible_directions)
+                        self.direction = self.rng.choice(possible_directions)
                 else:
                     # Choose direction based on target
                     self.direction = self._choose_direction(possible_directions, pacman_pos)
@@ -73,16 +92,8 @@ class Ghost:
             top_grid = int((next_y - self.radius) // CELL_SIZE)
             bottom_grid = int((next_y + self.radius) // CELL_SIZE)
             
-            # Check if all occupied cells are valid (or ghost areas)
-            can_move = True
-            for gx in range(left_grid, right_grid + 1):
-                for gy in range(top_grid, bottom_grid + 1):
-                    if not (self.maze.is_valid_position(gx, gy) or 
-                           (hasattr(self.maze, 'get_cell') and self.maze.get_cell(gx, gy) in ['G', 'H'])):
-                        can_move = False
-                        break
-                if not can_move:
-                    break
+            # Check if all occupied cells are valid (ghost house cells count as open)
+            can_move = self.maze.is_area_clear(left_grid, top_grid, right_grid, bottom_grid)
             
             if can_move:
                 self.pixel_x = next_x
@@ -93,10 +104,11 @@ class Ghost:
                 if possible_directions:
                     self.direction = possible_directions[0]
         
-        # Handle screen wrapping
+        # Handle wrapping across the maze (tunnel effect)
+        maze_width = self.maze.width * CELL_SIZE
         if self.pixel_x < -self.radius:
-            self.pixel_x = SCREEN_WIDTH + self.radius
-        elif self.pixel_x > SCREEN_WIDTH + self.radius:
+            self.pixel_x = maze_width + self.radius
+        elif self.pixel_x > maze_width + self.radius:
             self.pixel_x = -self.radius
         
         # Update grid position
@@ -112,22 +124,11 @@ class Ghost:
     def _get_possible_directions(self):
         """Get list of valid directions from current position"""
         directions = []
-        for direction in [UP, DOWN, LEFT, RIGHT]:
-            next_x = self.grid_x + direction[0]
-            next_y = self.grid_y + direction[1]
-            if self.maze.is_valid_position(next_x, next_y):
-                # Don't reverse direction unless it's the only option
-                reverse_dir = (-self.direction[0], -self.direction[1])
-                if direction != reverse_dir or len(directions) == 0:
-                    directions.append(direction)
-        
-        # If no forward directions available, allow reverse
-        if not directions:
-            reverse_dir = (-self.direction[0], -self.direction[1])
-            next_x = self.grid_x + reverse_dir[0]
-            next_y = self.grid_y + reverse_dir[1]
-            if self.maze.is_valid_position(next_x, next_y):
-                directions.append(reverse_dir)
+        reverse_dir = (-self.direction[0], -self.direction[1])
+        for direction in self.maze.legal_directions(self.grid_x, self.grid_y):
+            # Don't reverse direction unless it's the only option
+            if direction != reverse_dir or len(directions) == 0:
+                directions.append(direction)
         
         return directions
     
@@ -138,49 +139,42 @@ class Ghost:
         elif self.target_mode == "scatter":
             return self._scatter_behavior(possible_directions)
         else:
-            return random.choice(possible_directions)
+            return self.rng.choice(possible_directions)
     
     def _chase_pacman(self, possible_directions, pacman_pos):
-        """Chase Pacman directly"""
-        pacman_x, pacman_y = pacman_pos
-        min_distance = float('inf')
-        best_direction = possible_directions[0]
-        
-        for direction in possible_directions:
-            next_x = self.grid_x + direction[0]
-            next_y = self.grid_y + direction[1]
-            distance = math.sqrt((next_x - pacman_x)**2 + (next_y - pacman_y)**2)
-            
-            if distance < min_distance:
-                min_distance = distance
-                best_direction = direction
-        
-        return best_direction
+        """Chase Pacman along the shortest maze path"""
+        return self._closest_direction(possible_directions, pacman_pos)
     
     def _scatter_behavior(self, possible_directions):
         """Scatter to corners"""
-        # Target corners based on ghost color
-        if self.color == RED:
-            target = (0, 0)  # Top-left
-        elif self.color == PINK:
-            target = (18, 0)  # Top-right
-        elif self.color == CYAN:
-            target = (0, 20)  # Bottom-left
-        else:
-            target = (18, 20)  # Bottom-right
-        
+        return self._closest_direction(possible_directions, scatter_corner(self.color, self.maze))
+    
+    def _closest_direction(self, possible_directions, target):
+        """Pick the direction whose next cell has the shortest path to target"""
+        distances = self.maze.distances().row(target[0], target[1])
+        width = self.maze.width
         min_distance = float('inf')
         best_direction = possible_directions[0]
         
         for direction in possible_directions:
             next_x = self.grid_x + direction[0]
             next_y = self.grid_y + direction[1]
-            distance = math.sqrt((next_x - target[0])**2 + (next_y - target[1])**2)
+            distance = distances[next_y * width + next_x]
             
-            if distance < min_distance:
+            if 0 <= distance < min_distance:
                 min_distance = distance
                 best_direction = direction
         
+        if min_distance == float('inf'):
+            # Target beyond the distance field's search limit: head straight for it
+            min_distance = None
+            for direction in possible_directions:
+                dx = self.grid_x + direction[0] - target[0]
+                dy = self.grid_y + direction[1] - target[1]
+                if min_distance is None or dx * dx + dy * dy < min_distance:
+                    min_distance = dx * dx + dy * dy
+                    best_direction = direction
+        
         return best_direction
     
     def _return_to_start(self):
@@ -214,58 +208,24 @@ class Ghost:
         self.eaten = True
         self.frightened = False
     
-    def draw(self, screen):
-        """Draw the ghost"""
+    def draw(self, screen, offset=(0, 0)):
+        """Draw the ghost (one blit of a cached sprite)"""
         if self.eaten:
-            # Draw eyes only when eaten
-            pygame.draw.circle(screen, WHITE, 
-                             (int(self.pixel_x - 4), int(self.pixel_y - 2)), 3)
-            pygame.draw.circle(screen, WHITE, 
-                             (int(self.pixel_x + 4), int(self.pixel_y - 2)), 3)
-            pygame.draw.circle(screen, BLACK, 
-                             (int(self.pixel_x - 4), int(self.pixel_y - 2)), 1)
-            pygame.draw.circle(screen, BLACK, 
-                             (int(self.pixel_x + 4), int(self.pixel_y - 2)), 1)
+            state = GHOST_EATEN
+        elif self.frightened:
+            state = GHOST_FRIGHTENED
         else:
-            # Draw ghost body
-            color = BLUE if self.frightened else self.color
-            
-            # Ghost body (circle top, wavy bottom)
-            pygame.draw.circle(screen, color, 
-                             (int(self.pixel_x), int(self.pixel_y - 2)), self.radius)
-            
-            # Ghost bottom (rectangle with wavy edge)
-            bottom_rect = pygame.Rect(self.pixel_x - self.radius, self.pixel_y - 2,
-                                    self.radius * 2, self.radius + 2)
-            pygame.draw.rect(screen, color, bottom_rect)
-            
-            # Wavy bottom edge
-            wave_points = []
-            for i in range(5):
-                x = self.pixel_x - self.radius + (i * self.radius // 2)
-                y = self.pixel_y + self.radius - (2 if i % 2 == 0 else -2)
-                wave_points.append((x, y))
-            
-            if len(wave_points) > 2:
-                pygame.draw.polygon(screen, color, wave_points)
-            
-            # Eyes
-            if not self.frightened:
-                # Normal eyes
-                pygame.draw.circle(screen, WHITE, 
-                                 (int(self.pixel_x - 4), int(self.pixel_y - 2)), 3)
-                pygame.draw.circle(screen, WHITE, 
-                                 (int(self.pixel_x + 4), int(self.pixel_y - 2)), 3)
-                pygame.draw.circle(screen, BLACK, 
-                                 (int(self.pixel_x - 4), int(self.pixel_y - 2)), 1)
-                pygame.draw.circle(screen, BLACK, 
-                                 (int(self.pixel_x + 4), int(self.pixel_y - 2)), 1)
-            else:
-                # Frightened eyes (dots)
-                pygame.draw.circle(screen, WHITE, 
-                                 (int(self.pixel_x - 3), int(self.pixel_y)), 2)
-                pygame.draw.circle(screen, WHITE, 
-                                 (int(self.pixel_x + 3), int(self.pixel_y)), 2)
+            state = GHOST_NORMAL
+        # The wave under the body alternates as the ghost moves
+        phase = int(self.pixel_x + self.pixel_y) // 8 % 2
+        sprite = sprites.ghost_sprite(self.color, self.radius, state, self.direction, phase)
+        screen.blit(sprite, (int(self.pixel_x) - self.radius - 1 - offset[0],
+                             int(self.pixel_y) - self.radius - 3 - offset[1]))
+    
+    def sprite_rect(self):
+        """World pixel area covered by the drawn sprite"""
+        return sprites.rect(int(self.pixel_x) - self.radius - 1, int(self.pixel_y) - self.radius - 3,
+                     2 * self.radius + 2, 2 * self.radius + 6)
     
     def get_grid_position(self):
         """Get current grid position"""
@@ -280,4 +240,22 @@ class Ghost:
         self.frightened = False
         self.frightened_timer = 0
         self.eaten = False
-        self.rect.center = (self.pixel_x, self.pixel_y)
+    
+    def reset(self, target_mode, rng=None):
+        """Reset ghost for a new game, drawing a fresh starting direction"""
+        if rng is not None:
+            self.rng = rng
+        self.direction = self.rng.choice([UP, DOWN, LEFT, RIGHT])
+        self.target_mode = target_mode
+        self.speed = GHOST_SPEED
+        self.reset_position()
+    
+    def get_state(self):
+        """Get the ghost's state as a tuple of STATE_FIELDS"""
+        return _get_state(self)
+    
+    def set_state(self, state):
+        """Restore a state tuple from get_state"""
+        (self.start_x, self.start_y, self.pixel_x, self.pixel_y, self.grid_x, self.grid_y,
+         self.direction, self.target_mode, self.speed, self.frightened, self.frightened_timer,
+         self.eaten) = state
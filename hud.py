@@ -0,0 +1,95 @@
+import pygame
+from config import *
+
+PROFILE_REFRESH = 30  # Frames between updates of the profiler overlay
+
+
+class Label:
+    """A line of text that is only re-rendered when its value changes"""
+
+    def __init__(self, font, template, color):
+        self.font = font
+        self.template = template
+        self.color = color
+        self.value = None
+        self.surface = None
+
+    def render(self, value):
+        """Get the text surface for a value, rendering it only if it changed"""
+        if self.surface is None or value != self.value:
+            self.value = value
+            self.surface = self.font.render(self.template.format(value), True, self.color)
+        return self.surface
+
+
+class Hud:
+    """Score, lives and level display plus the pause and game over overlays.
+
+    Text is rendered once per value and the overlays are built once, so a
+    frame where nothing changed costs only blits.
+    """
+
+    def __init__(self, font, small_font):
+        self.score = Label(font, "Score: {}", WHITE)
+        self.lives = Label(font, "Lives: {}", WHITE)
+        self.level = Label(font, "Level: {}", WHITE)
+        self.final_score = Label(font, "Final Score: {}", WHITE)
+        self.power_text = small_font.render("POWER MODE!", True, YELLOW)
+
+        # Dimmed background shared by both overlays
+        self.shade = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.shade.set_alpha(128)
+        self.shade.fill(BLACK)
+
+        self.pause_text = font.render("PAUSED", True, WHITE)
+        self.continue_text = small_font.render("Press SPACE to continue", True, WHITE)
+        self.game_over_text = font.render("GAME OVER", True, RED)
+        self.restart_text = small_font.render("Press R to restart or ESC to quit", True, WHITE)
+
+        # Profiler overlay, created on first use
+        self.profile_lines = None
+        self.profile_frame = 0
+
+    def items(self, sim):
+        """(surface, position) pairs for score, lives, level and the power mode indicator.
+
+        An unchanged value keeps its surface object, so comparing the items
+        of two frames shows which labels changed.
+        """
+        items = [(self.score.render(sim.score), (10, 10)),
+                 (self.lives.render(sim.lives), (10, 50)),
+                 (self.level.render(sim.level), (10, 90))]
+        if sim.power_pellet_timer > 0:
+            items.append((self.power_text, (SCREEN_WIDTH - 120, 10)))
+        return items
+
+    def profile_items(self, profiler):
+        """(surface, position) pairs for the profiler's rolling phase timings"""
+        if self.profile_lines is None:
+            font = pygame.font.SysFont("monospace", 14)
+            self.profile_lines = [Label(font, "{}", GREEN) for _ in profiler.summary()]
+            self.profile_frame = None
+        if self.profile_frame is None or profiler.frame_count - self.profile_frame >= PROFILE_REFRESH:
+            # Re-rendering every frame would make the overlay its own bottleneck
+            self.profile_frame = profiler.frame_count
+            for label, line in zip(self.profile_lines, profiler.summary()):
+                label.render(line)
+        return [(label.surface, (SCREEN_WIDTH - 220, 40 + i * 16))
+                for i, label in enumerate(self.profile_lines)]
+
+    def draw_pause(self, screen):
+        """Draw the pause overlay"""
+        screen.blit(self.shade, (0, 0))
+        self._blit_centered(screen, self.pause_text, 0)
+        self._blit_centered(screen, self.continue_text, 40)
+
+    def draw_game_over(self, screen, score):
+        """Draw the game over overlay"""
+        screen.blit(self.shade, (0, 0))
+        self._blit_centered(screen, self.game_over_text, -20)
+        self._blit_centered(screen, self.final_score.render(score), 20)
+        self._blit_centered(screen, self.restart_text, 60)
+
+    def _blit_centered(self, screen, text, offset_y):
+        """Blit text centred horizontally, offset_y below the screen centre"""
+        screen.blit(text, text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + offset_y)))
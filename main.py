@@ -10,17 +10,57 @@ Controls:
 - SPACE: Pause/Unpause
 - ESC: Quit game
 - R: Restart (when game over)
+
+Pass --seed N to replay exactly the same ghost behaviour for the same inputs.
+Use --record FILE to save the session as a replay, and --replay FILE
+to watch it; LEFT/RIGHT seek in replays. --speed 10 runs the game (or
+replay) 10x faster than real time while still rendering at 60 FPS.
+--dirty-rects redraws only the parts of the screen that changed each frame.
+--profile shows per-phase frame timings (F3 toggles them) and --trace FILE
+writes a Chrome trace of them on exit.
+--maze FILE plays on a maze from a text file (same symbols as maze.py), and
+--random-maze 101x101 on a generated one; the view scrolls to follow Pacman.
+--swarm 500 plays against a swarm of 500 ghosts, all updated together.
+--threaded runs the simulation on its own thread, drawing while it ticks.
 """
 
+import argparse
+import time
+START_TIME = time.perf_counter()  # Before the game modules load, so start-up time includes them
 from game import Game
+from mazegen import add_maze_arguments, layout_from_args
 
 def main():
     """Main function to start the game"""
+    parser = argparse.ArgumentParser(description="Play Pacman")
+    parser.add_argument("--seed", type=int, default=None, help="seed for a reproducible game")
+    parser.add_argument("--record", metavar="FILE", help="record the last game played to a replay file")
+    parser.add_argument("--replay", metavar="FILE", help="watch a recorded replay")
+    parser.add_argument("--speed", type=float, default=1,
+                        help="simulation speed, e.g. 10 to fast-forward 10x (games and replays)")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="update only the changed parts of the screen (faster on software displays)")
+    parser.add_argument("--profile", action="store_true", help="time each frame phase (F3 toggles the overlay)")
+    parser.add_argument("--trace", metavar="FILE", help="write a Chrome trace of frame phases on exit")
+    add_maze_arguments(parser)
+    parser.add_argument("--swarm", metavar="N", type=int, help="play against a swarm of N ghosts")
+    parser.add_argument("--threaded", action="store_true",
+                        help="tick the simulation on a separate thread from rendering")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    if args.swarm and (args.record or args.replay):
+        parser.error("--swarm games cannot be recorded or replayed")
+    if args.swarm and args.threaded:
+        parser.error("--swarm and --threaded cannot be combined")
+    
     try:
-        print("Initializing Pacman game...")
-        game = Game()
-        print("Game initialized successfully!")
-        print("Starting game loop...")
+        layout = layout_from_args(args)
+        game = Game(seed=args.seed, record_path=args.record, replay_path=args.replay,
+                    speed=args.speed, dirty_rects=args.dirty_rects,
+                    profile=args.profile, trace_path=args.trace, layout=layout,
+                    swarm=args.swarm, threaded=args.threaded)
+        print(f"Game ready in {(time.perf_counter() - START_TIME) * 1000:.0f} ms (seed {game.sim.seed})")
         game.run()
     except KeyboardInterrupt:
         print("\nGame interrupted by user")
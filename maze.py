@@ -1,109 +1,391 @@
-import pygame
+import hashlib
+from collections import OrderedDict
 from config import *
+from distance import get_distance_field
+from sprites import load_pygame
 
-class Maze:
-    def __init__(self):
-        # Classic Pacman maze layout
-        self.layout = [
-            "###################",
-            "#........#........#",
-            "#o##.###.#.###.##o#",
-            "#.................#",
-            "#.##.#.#####.#.##.#",
-            "#....#...#...#....#",
-            "####.###.#.###.####",
-            "   #.#.......#.#   ",
-            "####.#.## ##.#.####",
-            "#......#GGG#......#",
-            "####.#.#GGG#.#.####",
-            "   #.#.......#.#   ",
-            "####.#.#####.#.####",
-            "#........#........#",
-            "#.##.###.#.###.##.#",
-            "#o.#.....P.....#.o#",
-            "##.#.#.#####.#.#.##",
-            "#....#...#...#....#",
-            "#.######.#.######.#",
-            "#.................#",
-            "###################"
-        ]
-        
-        self.width = len(self.layout[0])
-        self.height = len(self.layout)
-        self.pellets = []
-        self.power_pellets = []
-        self.walls = []
+# Pellet grid cell values
+NO_PELLET = 0
+SMALL_PELLET = 1
+BIG_PELLET = 2
+
+# Walkability grid cell values (non-zero cells can be entered)
+BLOCKED = 0
+OPEN = 1
+GHOST_HOUSE_CELL = 2
+
+# Every subset of directions, indexed by bitmask, in the order the AI tries them
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+MOVE_SETS = tuple(tuple(d for bit, d in enumerate(DIRECTIONS) if mask & (1 << bit))
+                  for mask in range(16))
+
+# Rendering is split into square chunks of cells, built only when visible
+CHUNK_CELLS = 16
+CHUNK_SIZE = CHUNK_CELLS * CELL_SIZE
+MAX_CACHED_CHUNKS = 32
+
+MAX_CACHED_TEMPLATES = 8  # Parsed layouts kept per process
+
+MAZE_SYMBOLS = frozenset((WALL, PELLET, POWER_PELLET, EMPTY, PACMAN_START, GHOST_START, GHOST_HOUSE))
+
+# Classic Pacman maze layout
+CLASSIC_LAYOUT = (
+    "###################",
+    "#........#........#",
+    "#o##.###.#.###.##o#",
+    "#.................#",
+    "#.##.#.#####.#.##.#",
+    "#....#...#...#....#",
+    "####.###.#.###.####",
+    "   #.#.......#.#   ",
+    "####.#.## ##.#.####",
+    "#......#GGG#......#",
+    "####.#.#GGG#.#.####",
+    "   #.#.......#.#   ",
+    "####.#.#####.#.####",
+    "#........#........#",
+    "#.##.###.#.###.##.#",
+    "#o.#.....P.....#.o#",
+    "##.#.#.#####.#.#.##",
+    "#....#...#...#....#",
+    "#.######.#.######.#",
+    "#.................#",
+    "###################",
+)
+
+
+def load_layout(path):
+    """Read a maze layout from a text file, one row of maze symbols per line.
+    
+    Short rows are padded with walls so every row has the same width. The
+    maze needs exactly one Pacman start and at least four ghost cells.
+    """
+    with open(path) as f:
+        rows = [line.rstrip("\r\n") for line in f]
+    while rows and not rows[-1].strip():
+        rows.pop()
+    if not rows:
+        raise ValueError(f"{path} contains no maze rows")
+    for y, row in enumerate(rows):
+        unknown = set(row) - MAZE_SYMBOLS
+        if unknown:
+            raise ValueError(f"{path}, row {y + 1}: unknown maze symbols {''.join(sorted(unknown))!r}")
+    pacman_starts = sum(row.count(PACMAN_START) for row in rows)
+    if pacman_starts != 1:
+        raise ValueError(f"{path} must have exactly one Pacman start ({PACMAN_START!r}), found {pacman_starts}")
+    ghost_starts = sum(row.count(GHOST_START) for row in rows)
+    if ghost_starts < 4:
+        raise ValueError(f"{path} must have at least four ghost cells ({GHOST_START!r}), found {ghost_starts}")
+    width = max(len(row) for row in rows)
+    return tuple(row.ljust(width, WALL) for row in rows)
+
+# Parsed layouts shared by every Maze in the process, keyed by layout rows
+_templates = OrderedDict()
+
+
+def get_template(layout):
+    """Get the shared parsed form of a layout, parsing it if needed"""
+    template = _templates.get(layout)
+    if template is None:
+        template = MazeTemplate(layout)
+        _templates[layout] = template
+        if len(_templates) > MAX_CACHED_TEMPLATES:
+            _templates.popitem(last=False)
+    else:
+        _templates.move_to_end(layout)
+    return template
+
+
+def clear_template_cache():
+    """Forget every parsed layout, so the next Maze of each layout parses it again"""
+    _templates.clear()
+
+
+class MazeTemplate:
+    """The static, parsed form of a layout, shared by every Maze built from it.
+    
+    Holds the geometry (walkability and legal moves per cell), the start
+    cells and the pristine pellet bitmap. Nothing here changes during play.
+    """
+    
+    def __init__(self, layout):
+        self.layout = layout
+        self.width = len(layout[0])
+        self.height = len(layout)
+        self.layout_hash = hashlib.sha1("\n".join(layout).encode()).hexdigest()
+        # Pellets are indexed by cell (y * width + x) for O(1) lookups
+        pellet_grid = bytearray(self.width * self.height)
+        self.pellet_cells = []  # Cells that started with a pellet, for drawing
+        # Walkability and legal moves per cell, precomputed for the hot paths
+        self.walkable = bytearray(self.width * self.height)
+        self.legal_moves = []
         self.pacman_start = None
         self.ghost_starts = []
         
-        self._parse_maze()
-    
-    def _parse_maze(self):
-        """Parse the maze layout and create game objects"""
-        for y, row in enumerate(self.layout):
+        for y, row in enumerate(layout):
             for x, cell in enumerate(row):
-                pos = (x * CELL_SIZE, y * CELL_SIZE)
-                
-                if cell == WALL:
-                    self.walls.append(pygame.Rect(pos[0], pos[1], CELL_SIZE, CELL_SIZE))
-                elif cell == PELLET:
-                    self.pellets.append(pygame.Rect(pos[0] + CELL_SIZE//2 - 2, 
-                                                  pos[1] + CELL_SIZE//2 - 2, 4, 4))
-                elif cell == POWER_PELLET:
-                    self.power_pellets.append(pygame.Rect(pos[0] + CELL_SIZE//2 - 6, 
-                                                        pos[1] + CELL_SIZE//2 - 6, 12, 12))
+                if cell == PELLET or cell == POWER_PELLET:
+                    index = y * self.width + x
+                    pellet_grid[index] = SMALL_PELLET if cell == PELLET else BIG_PELLET
+                    self.pellet_cells.append(index)
                 elif cell == PACMAN_START:
                     self.pacman_start = (x, y)
                 elif cell == GHOST_START:
                     self.ghost_starts.append((x, y))
+                
+                if cell == GHOST_START or cell == GHOST_HOUSE:
+                    self.walkable[y * self.width + x] = GHOST_HOUSE_CELL
+                elif cell != WALL:
+                    self.walkable[y * self.width + x] = OPEN
+        
+        self.pellet_grid = bytes(pellet_grid)
+        self.pellet_total = len(self.pellet_cells)
+        self._build_move_table()
+    
+    def _build_move_table(self):
+        """Precompute the legal directions out of every cell"""
+        width = self.width
+        size = width * self.height
+        walkable = self.walkable
+        self.legal_moves = legal_moves = []
+        for index in range(size):
+            mask = 0
+            if walkable[index]:
+                # Same bit order as DIRECTIONS: up, down, left, right
+                x = index % width
+                if index >= width and walkable[index - width]:
+                    mask |= 1
+                if index + width < size and walkable[index + width]:
+                    mask |= 2
+                if x > 0 and walkable[index - 1]:
+                    mask |= 4
+                if x < width - 1 and walkable[index + 1]:
+                    mask |= 8
+            legal_moves.append(MOVE_SETS[mask])
+
+
+class Maze:
+    def __init__(self, layout=None):
+        # Rows of maze symbols, all the same width; the classic maze by default
+        self.template = template = get_template(tuple(layout) if layout is not None else CLASSIC_LAYOUT)
+        self.layout = template.layout
+        
+        # Static geometry, shared with every maze of the same layout
+        self.width = template.width
+        self.height = template.height
+        self.layout_hash = template.layout_hash
+        self.pellet_cells = template.pellet_cells
+        self.walkable = template.walkable
+        self.legal_moves = template.legal_moves
+        self.pacman_start = template.pacman_start
+        self.ghost_starts = template.ghost_starts
+        
+        # Pellets left in this maze, copied from the template's pristine bitmap
+        self.pellet_grid = bytearray(template.pellet_grid)
+        self.pellets_remaining = template.pellet_total
+        self._pellets_shared = False  # Set while a snapshot references pellet_grid
+        
+        # Pre-rendered chunks of the maze, built as they come into view
+        self._chunks = OrderedDict()
+        self._redraw = True  # Set until the maze is drawn, and whenever the chunks are dropped
+        self._dirty_rects = []  # Maze areas changed since the last draw
+        
+        # Path distances for ghost targeting, shared between mazes with the same layout
+        self._distances = None
+    
+    def reset(self):
+        """Put every pellet back, keeping the geometry and the distance field"""
+        if self._pellets_shared:
+            # A snapshot still holds the current grid; leave it alone
+            self.pellet_grid = bytearray(self.template.pellet_grid)
+            self._pellets_shared = False
+        else:
+            self.pellet_grid[:] = self.template.pellet_grid
+        self.pellets_remaining = self.template.pellet_total
+        # The rendered chunks show eaten pellets; rebuild them as they are drawn
+        self._chunks.clear()
+        self._redraw = True
+        self._dirty_rects = []
     
     def is_wall(self, x, y):
         """Check if position is a wall"""
         if 0 <= y < self.height and 0 <= x < self.width:
-            return self.layout[y][x] == WALL
+            return not self.walkable[y * self.width + x]
         return True
     
     def is_valid_position(self, x, y):
         """Check if position is valid (not a wall)"""
         if 0 <= y < self.height and 0 <= x < self.width:
-            cell = self.layout[y][x]
-            return cell != WALL
+            return self.walkable[y * self.width + x] != BLOCKED
         return False
     
+    def distances(self):
+        """Get the (shared, lazily built) path distance field for this layout"""
+        if self._distances is None:
+            self._distances = get_distance_field(self)
+        return self._distances
+    
+    def is_area_clear(self, left, top, right, bottom):
+        """Check that every cell in the inclusive grid rectangle is walkable"""
+        if left < 0 or top < 0 or right >= self.width or bottom >= self.height:
+            return False
+        walkable = self.walkable
+        for y in range(top, bottom + 1):
+            row = y * self.width
+            for x in range(left, right + 1):
+                if not walkable[row + x]:
+                    return False
+        return True
+    
+    def legal_directions(self, x, y):
+        """Get the directions that lead out of a cell into a walkable cell"""
+        if 0 <= y < self.height and 0 <= x < self.width:
+            return self.legal_moves[y * self.width + x]
+        return ()
+    
     def get_cell(self, x, y):
         """Get the cell type at grid position"""
         if 0 <= y < self.height and 0 <= x < self.width:
             return self.layout[y][x]
         return WALL
     
-    def draw(self, screen):
-        """Draw the maze"""
-        # Draw walls
-        for wall in self.walls:
-            pygame.draw.rect(screen, BLUE, wall)
-        
-        # Draw pellets
-        for pellet in self.pellets:
-            pygame.draw.rect(screen, YELLOW, pellet)
+    def draw(self, screen, offset=(0, 0)):
+        """Draw the chunks of the maze inside the screen's clip area.
         
-        # Draw power pellets
-        for power_pellet in self.power_pellets:
-            pygame.draw.ellipse(screen, YELLOW, power_pellet)
-    
-    def remove_pellet(self, rect):
-        """Remove a pellet from the maze"""
-        if rect in self.pellets:
-            self.pellets.remove(rect)
+        `offset` is the world pixel position shown at the screen's top-left
+        corner, so only the cells in view are ever rendered.
+        """
+        view = screen.get_clip().move(offset)
+        first_x = max(0, view.left // CHUNK_SIZE)
+        last_x = min((self.width - 1) // CHUNK_CELLS, (view.right - 1) // CHUNK_SIZE)
+        first_y = max(0, view.top // CHUNK_SIZE)
+        last_y = min((self.height - 1) // CHUNK_CELLS, (view.bottom - 1) // CHUNK_SIZE)
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                screen.blit(self._chunk(chunk_x, chunk_y),
+                            (chunk_x * CHUNK_SIZE - offset[0], chunk_y * CHUNK_SIZE - offset[1]))
+        self._redraw = False
+        self._dirty_rects.clear()
+    
+    def take_dirty_rects(self):
+        """Maze areas (world pixel Rects) changed since the last draw, or None if all of it must be redrawn"""
+        if self._redraw:
+            return None
+        pygame = load_pygame()
+        rects = [pygame.Rect(rect) for rect in self._dirty_rects]
+        self._dirty_rects = []
+        return rects
+    
+    def _chunk(self, chunk_x, chunk_y):
+        """Get a chunk's pre-rendered walls and pellets, rendering it if needed"""
+        key = (chunk_x, chunk_y)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._build_chunk(chunk_x, chunk_y)
+            self._chunks[key] = chunk
+            if len(self._chunks) > MAX_CACHED_CHUNKS:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(key)
+        return chunk
+    
+    def _build_chunk(self, chunk_x, chunk_y):
+        """Render the walls and remaining pellets of one chunk"""
+        pygame = load_pygame()
+        left = chunk_x * CHUNK_CELLS
+        top = chunk_y * CHUNK_CELLS
+        right = min(left + CHUNK_CELLS, self.width)
+        bottom = min(top + CHUNK_CELLS, self.height)
+        chunk = pygame.Surface(((right - left) * CELL_SIZE, (bottom - top) * CELL_SIZE))
+        chunk.fill(BLACK)
+        for y in range(top, bottom):
+            row = y * self.width
+            for x in range(left, right):
+                if not self.walkable[row + x]:
+                    chunk.fill(BLUE, ((x - left) * CELL_SIZE, (y - top) * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+                elif self.pellet_grid[row + x]:
+                    self._draw_pellet(chunk, x - left, y - top, self.pellet_grid[row + x])
+        # Match the display format for fast blits when there is a display
+        if pygame.display.get_surface() is not None:
+            chunk = chunk.convert()
+        return chunk
+    
+    def _draw_pellet(self, surface, x, y, kind):
+        """Draw a single pellet or power pellet at grid position"""
+        pygame = load_pygame()
+        pos = (x * CELL_SIZE, y * CELL_SIZE)
+        if kind == SMALL_PELLET:
+            pygame.draw.rect(surface, YELLOW, (pos[0] + CELL_SIZE//2 - 2,
+                                               pos[1] + CELL_SIZE//2 - 2, 4, 4))
+        else:
+            pygame.draw.ellipse(surface, YELLOW, (pos[0] + CELL_SIZE//2 - 6,
+                                                  pos[1] + CELL_SIZE//2 - 6, 12, 12))
+    
+    def pellet_at(self, x, y):
+        """Get the pellet kind at grid position"""
+        if 0 <= y < self.height and 0 <= x < self.width:
+            return self.pellet_grid[y * self.width + x]
+        return NO_PELLET
+    
+    def iter_pellets(self):
+        """Yield (x, y, kind) for every pellet still in the maze"""
+        grid = self.pellet_grid
+        for index in self.pellet_cells:
+            kind = grid[index]
+            if kind:
+                yield index % self.width, index // self.width, kind
+    
+    def _take_pellet(self, x, y, kind):
+        """Remove a pellet of the given kind at grid position, if present"""
+        if 0 <= y < self.height and 0 <= x < self.width:
+            index = y * self.width + x
+            if self.pellet_grid[index] == kind:
+                if self._pellets_shared:
+                    # Copy on write: snapshots keep the grid they were given
+                    self.pellet_grid = bytearray(self.pellet_grid)
+                    self._pellets_shared = False
+                self.pellet_grid[index] = NO_PELLET
+                self.pellets_remaining -= 1
+                chunk = self._chunks.get((x // CHUNK_CELLS, y // CHUNK_CELLS))
+                if chunk is not None:
+                    chunk.fill(BLACK, ((x % CHUNK_CELLS) * CELL_SIZE, (y % CHUNK_CELLS) * CELL_SIZE,
+                                       CELL_SIZE, CELL_SIZE))
+                if not self._redraw:
+                    self._dirty_rects.append((x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+                return True
+        return False
+    
+    def remove_pellet(self, x, y):
+        """Remove a pellet at grid position from the maze"""
+        if self._take_pellet(x, y, SMALL_PELLET):
             return PELLET_SCORE
         return 0
     
-    def remove_power_pellet(self, rect):
-        """Remove a power pellet from the maze"""
-        if rect in self.power_pellets:
-            self.power_pellets.remove(rect)
+    def remove_power_pellet(self, x, y):
+        """Remove a power pellet at grid position from the maze"""
+        if self._take_pellet(x, y, BIG_PELLET):
             return POWER_PELLET_SCORE
         return 0
     
+    def share_pellets(self):
+        """Hand out the pellet grid for a snapshot without copying it.
+        
+        The grid is copied on the next pellet eaten, so the snapshot never
+        sees later changes.
+        """
+        self._pellets_shared = True
+        return self.pellet_grid, self.pellets_remaining
+    
+    def restore_pellets(self, pellet_grid, pellets_remaining):
+        """Adopt a pellet grid from share_pellets (shared until written)"""
+        if pellet_grid is not self.pellet_grid:
+            # The rendered chunks no longer match; rebuild them as they are drawn
+            self._chunks.clear()
+            self._redraw = True
+        self.pellet_grid = pellet_grid
+        self.pellets_remaining = pellets_remaining
+        self._pellets_shared = True
+    
     def all_pellets_eaten(self):
         """Check if all pellets have been eaten"""
-        return len(self.pellets) == 0 and len(self.power_pellets) == 0
+        return self.pellets_remaining == 0
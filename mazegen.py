@@ -0,0 +1,133 @@
+"""
+Procedural maze generator.
+
+Carves a random spanning tree of corridors (depth-first search on the odd
+cells), then braids it by opening every dead end so Pacman is never
+trapped in a corridor, and stamps a ghost house in the middle. The same
+size and seed always give the same layout.
+
+Usage: python mazegen.py WIDTH HEIGHT [--seed N] [-o FILE]
+"""
+
+import argparse
+import random
+from config import *
+from maze import load_layout
+
+MIN_SIZE = 11
+MAX_SIZE = 500
+POWER_PELLET_SPACING = 600  # Open cells per extra power pellet, beyond the four corners
+
+# Ghost house with the corridor ring around it; its gap opens upwards like the classic maze
+GHOST_HOUSE_TEMPLATE = (
+    ".......",
+    ".## ##.",
+    ".#GGG#.",
+    ".#GGG#.",
+    ".#####.",
+    "...P...",
+)
+
+_STEPS = ((0, -2), (0, 2), (-2, 0), (2, 0))
+
+
+def generate_layout(width, height, seed=None):
+    """Generate a maze layout of width x height cells (both between MIN_SIZE and MAX_SIZE)"""
+    if not (MIN_SIZE <= width <= MAX_SIZE and MIN_SIZE <= height <= MAX_SIZE):
+        raise ValueError(f"maze size must be between {MIN_SIZE} and {MAX_SIZE} cells per side")
+    rng = random.Random(seed)
+    grid = [bytearray(WALL * width, "ascii") for _ in range(height)]
+    # Corridor cells sit on odd coordinates; an even maze size leaves an extra wall row/column
+    last_x = width - 2 if width % 2 else width - 3
+    last_y = height - 2 if height % 2 else height - 3
+    open_cell = ord(PELLET)
+
+    def neighbors(x, y):
+        for dx, dy in _STEPS:
+            if 1 <= x + dx <= last_x and 1 <= y + dy <= last_y:
+                yield x + dx, y + dy
+
+    # Random depth-first spanning tree
+    grid[1][1] = open_cell
+    stack = [(1, 1)]
+    while stack:
+        x, y = stack[-1]
+        unvisited = [(nx, ny) for nx, ny in neighbors(x, y) if grid[ny][nx] != open_cell]
+        if not unvisited:
+            stack.pop()
+            continue
+        nx, ny = rng.choice(unvisited)
+        grid[(y + ny) // 2][(x + nx) // 2] = open_cell
+        grid[ny][nx] = open_cell
+        stack.append((nx, ny))
+
+    # Braid: connect every dead end to another corridor
+    for y in range(1, last_y + 1, 2):
+        for x in range(1, last_x + 1, 2):
+            walls = [(nx, ny) for nx, ny in neighbors(x, y)
+                     if grid[(y + ny) // 2][(x + nx) // 2] != open_cell]
+            exits = sum(1 for _ in neighbors(x, y)) - len(walls)
+            if exits == 1 and walls:
+                nx, ny = rng.choice(walls)
+                grid[(y + ny) // 2][(x + nx) // 2] = open_cell
+
+    # Ghost house and Pacman start in the middle
+    house_x = width // 2 - len(GHOST_HOUSE_TEMPLATE[0]) // 2
+    house_y = height // 2 - len(GHOST_HOUSE_TEMPLATE) // 2
+    for dy, row in enumerate(GHOST_HOUSE_TEMPLATE):
+        grid[house_y + dy][house_x:house_x + len(row)] = row.encode("ascii")
+
+    # Power pellets in the four corners, plus more spread over large mazes
+    corners = [(1, 1), (last_x, 1), (1, last_y), (last_x, last_y)]
+    pellets = [(x, y) for y in range(height) for x in range(width) if grid[y][x] == open_cell]
+    extra = rng.sample(pellets, min(len(pellets), len(pellets) // POWER_PELLET_SPACING))
+    for x, y in corners + extra:
+        if grid[y][x] == open_cell:
+            grid[y][x] = ord(POWER_PELLET)
+
+    return tuple(row.decode("ascii") for row in grid)
+
+
+def parse_size(text):
+    """Parse a WIDTHxHEIGHT size such as 101x101"""
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height or width)
+
+
+def add_maze_arguments(parser):
+    """Add the options that pick a maze: --maze FILE or --random-maze WxH, with --maze-seed"""
+    maze_group = parser.add_mutually_exclusive_group()
+    maze_group.add_argument("--maze", metavar="FILE", help="play on a maze loaded from a text file")
+    maze_group.add_argument("--random-maze", metavar="WxH", type=parse_size,
+                            help=f"play on a generated maze, e.g. 101x101 (up to {MAX_SIZE}x{MAX_SIZE})")
+    parser.add_argument("--maze-seed", type=int, default=0, help="seed for --random-maze")
+
+
+def layout_from_args(args):
+    """The layout picked by the add_maze_arguments options, or None for the classic maze"""
+    if args.maze:
+        return load_layout(args.maze)
+    if args.random_maze:
+        return generate_layout(*args.random_maze, seed=args.maze_seed)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a random Pacman maze")
+    parser.add_argument("width", type=int, help=f"maze width in cells ({MIN_SIZE}-{MAX_SIZE})")
+    parser.add_argument("height", type=int, help=f"maze height in cells ({MIN_SIZE}-{MAX_SIZE})")
+    parser.add_argument("--seed", type=int, default=0, help="generator seed")
+    parser.add_argument("-o", "--output", metavar="FILE", help="write the layout here instead of printing it")
+    args = parser.parse_args()
+
+    layout = generate_layout(args.width, args.height, args.seed)
+    text = "\n".join(layout) + "\n"
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text, end="")
+
+
+if __name__ == "__main__":
+    main()
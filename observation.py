@@ -0,0 +1,115 @@
+"""
+Observation planes for training: the game state as a stack of grids.
+
+One uint8 plane per feature, each the size of the maze (height x width):
+walls, pellets, power pellets, Pacman, and ghosts split into normal,
+frightened and eaten (ghost planes count the ghosts in each cell). The
+planes are allocated once and patched as the game changes: an eaten pellet
+clears one cell and an entity that moves to another cell (or changes state)
+updates two. Simulation.observe() hands out a read-only view of them.
+"""
+
+import numpy as np
+from config import *
+from maze import SMALL_PELLET, BIG_PELLET, BLOCKED
+
+PLANES = ("walls", "pellets", "power_pellets", "pacman", "ghosts", "frightened_ghosts", "eaten_ghosts")
+(WALLS_PLANE, PELLETS_PLANE, POWER_PELLETS_PLANE, PACMAN_PLANE,
+ GHOSTS_PLANE, FRIGHTENED_PLANE, EATEN_PLANE) = range(len(PLANES))
+
+
+class ObservationPlanes:
+    """Preallocated observation planes kept in step with a Simulation"""
+
+    def __init__(self, sim):
+        self.sim = sim
+        maze = sim.maze
+        self.width = maze.width
+        self.height = maze.height
+        self.planes = np.zeros((len(PLANES), maze.height, maze.width), dtype=np.uint8)
+        self._flat = self.planes.reshape(len(PLANES), -1)  # Same memory, indexed by cell
+
+        # What callers get: a view that cannot be written through
+        self.view = self.planes.view()
+        self.view.flags.writeable = False
+
+        self._pellets_remaining = 0
+        self._pacman_key = None
+        self._ghost_keys = []
+        self.rebuild()
+
+    def _cell(self, entity):
+        """Cell index under an entity's centre, or -1 when it is off the grid (in a tunnel)"""
+        x = int(entity.pixel_x // CELL_SIZE)
+        y = int(entity.pixel_y // CELL_SIZE)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return -1
+
+    def _ghost_key(self, ghost):
+        if ghost.eaten:
+            plane = EATEN_PLANE
+        elif ghost.frightened:
+            plane = FRIGHTENED_PLANE
+        else:
+            plane = GHOSTS_PLANE
+        return plane, self._cell(ghost)
+
+    def rebuild(self):
+        """Recompute every plane from scratch (after a reset or restore)"""
+        flat = self._flat
+        flat[WALLS_PLANE] = np.frombuffer(self.sim.maze.walkable, dtype=np.uint8) == BLOCKED
+        self._refill_pellets()
+
+        flat[PACMAN_PLANE:] = 0
+        self._pacman_key = self._cell(self.sim.pacman)
+        if self._pacman_key >= 0:
+            flat[PACMAN_PLANE, self._pacman_key] = 1
+        self._ghost_keys = [self._ghost_key(ghost) for ghost in self.sim.ghosts]
+        for plane, cell in self._ghost_keys:
+            if cell >= 0:
+                flat[plane, cell] += 1
+
+    def _refill_pellets(self):
+        maze = self.sim.maze
+        grid = np.frombuffer(maze.pellet_grid, dtype=np.uint8)
+        np.equal(grid, SMALL_PELLET, out=self._flat[PELLETS_PLANE], casting="unsafe")
+        np.equal(grid, BIG_PELLET, out=self._flat[POWER_PELLETS_PLANE], casting="unsafe")
+        self._pellets_remaining = maze.pellets_remaining
+
+    def pellet_eaten(self, x, y):
+        """Clear the pellet planes at a cell whose pellet was just eaten"""
+        index = y * self.width + x
+        self._flat[PELLETS_PLANE, index] = 0
+        self._flat[POWER_PELLETS_PLANE, index] = 0
+        self._pellets_remaining -= 1
+
+    def update(self):
+        """Move Pacman and the ghosts to their current cells in the planes"""
+        sim = self.sim
+        flat = self._flat
+        if sim.maze.pellets_remaining != self._pellets_remaining:
+            # The maze was refilled for a new level
+            self._refill_pellets()
+
+        cell = self._cell(sim.pacman)
+        if cell != self._pacman_key:
+            if self._pacman_key >= 0:
+                flat[PACMAN_PLANE, self._pacman_key] = 0
+            if cell >= 0:
+                flat[PACMAN_PLANE, cell] = 1
+            self._pacman_key = cell
+
+        keys = self._ghost_keys
+        if len(keys) != len(sim.ghosts):
+            self.rebuild()
+            return
+        for i, ghost in enumerate(sim.ghosts):
+            key = self._ghost_key(ghost)
+            old = keys[i]
+            if key != old:
+                if old[1] >= 0:
+                    flat[old] -= 1
+                if key[1] >= 0:
+                    flat[key] += 1
+                keys[i] = key
@@ -1,8 +1,16 @@
-import pygame
-import math
+from operator import attrgetter
 from config import *
+import sprites  # Drawing only; sprites loads pygame on first draw
+
+# Attributes that make up Pacman's state in a simulation snapshot
+STATE_FIELDS = ("pixel_x", "pixel_y", "grid_x", "grid_y", "direction", "next_direction",
+                "mouth_angle", "mouth_speed")
+_get_state = attrgetter(*STATE_FIELDS)
+
 
 class Pacman:
+    __slots__ = ("maze", "speed", "radius") + STATE_FIELDS
+    
     def __init__(self, x, y, maze):
         self.maze = maze
         self.grid_x = x
@@ -15,8 +23,6 @@ class Pacman:
         self.radius = 12
         self.mouth_angle = 0
         self.mouth_speed = 8
-        self.rect = pygame.Rect(self.pixel_x - self.radius, self.pixel_y - self.radius, 
-                               self.radius * 2, self.radius * 2)
     
     def update(self):
         """Update Pacman's position and animation"""
@@ -55,14 +61,7 @@ class Pacman:
             bottom_grid = int((next_y + self.radius) // CELL_SIZE)
             
             # Check if all occupied cells are valid
-            can_move = True
-            for gx in range(left_grid, right_grid + 1):
-                for gy in range(top_grid, bottom_grid + 1):
-                    if not self.maze.is_valid_position(gx, gy):
-                        can_move = False
-                        break
-                if not can_move:
-                    break
+            can_move = self.maze.is_area_clear(left_grid, top_grid, right_grid, bottom_grid)
             
             if can_move:
                 self.pixel_x = next_x
@@ -72,20 +71,22 @@ class Pacman:
                 self.direction = STOP
                 self._snap_to_grid_center()
         
-        # Handle screen wrapping (tunnel effect)
+        # Handle wrapping across the maze (tunnel effect)
+        maze_width = self.maze.width * CELL_SIZE
         if self.pixel_x < -self.radius:
-            self.pixel_x = SCREEN_WIDTH + self.radius
-        elif self.pixel_x > SCREEN_WIDTH + self.radius:
+            self.pixel_x = maze_width + self.radius
+        elif self.pixel_x > maze_width + self.radius:
             self.pixel_x = -self.radius
         
         # Update grid position
         self.grid_x = int(self.pixel_x // CELL_SIZE)
         self.grid_y = int(self.pixel_y // CELL_SIZE)
         
-        # Update rectangle for collision detection
-        self.rect.center = (int(self.pixel_x), int(self.pixel_y))
-        
-        # Update mouth animation (only when moving)
+        # Update mouth animation
+        self.animate()
+    
+    def animate(self):
+        """Advance the mouth animation (only when moving)"""
         if self.direction != STOP:
             self.mouth_angle += self.mouth_speed
             if self.mouth_angle > 45:
@@ -111,59 +112,16 @@ class Pacman:
         """Set the next direction for Pacman"""
         self.next_direction = direction
     
-    def draw(self, screen):
-        """Draw Pacman with mouth animation"""
-        # Determine rotation based on direction
-        rotation = 0
-        if self.direction == LEFT:
-            rotation = 180
-        elif self.direction == UP:
-            rotation = 90
-        elif self.direction == DOWN:
-            rotation = 270
-        
-        # Calculate mouth angles
-        start_angle = math.radians(rotation + self.mouth_angle)
-        end_angle = math.radians(rotation - self.mouth_angle)
-        
-        # Draw Pacman body
-        if self.direction == STOP or self.mouth_angle <= 0:
-            # Draw full circle when stopped or mouth closed
-            pygame.draw.circle(screen, YELLOW, 
-                             (int(self.pixel_x), int(self.pixel_y)), self.radius)
-        else:
-            # Draw Pacman with mouth
-            points = [(int(self.pixel_x), int(self.pixel_y))]
-            
-            # Create arc points
-            for angle in range(int(math.degrees(start_angle)), 
-                             int(math.degrees(end_angle)) + 1):
-                x = self.pixel_x + self.radius * math.cos(math.radians(angle))
-                y = self.pixel_y + self.radius * math.sin(math.radians(angle))
-                points.append((int(x), int(y)))
-            
-            if len(points) > 2:
-                pygame.draw.polygon(screen, YELLOW, points)
-            else:
-                pygame.draw.circle(screen, YELLOW, 
-                                 (int(self.pixel_x), int(self.pixel_y)), self.radius)
-        
-        # Draw eye
-        eye_offset = 4
-        if self.direction == RIGHT or self.direction == STOP:
-            eye_x = self.pixel_x + eye_offset
-            eye_y = self.pixel_y - eye_offset
-        elif self.direction == LEFT:
-            eye_x = self.pixel_x - eye_offset
-            eye_y = self.pixel_y - eye_offset
-        elif self.direction == UP:
-            eye_x = self.pixel_x + eye_offset
-            eye_y = self.pixel_y - eye_offset
-        else:  # DOWN
-            eye_x = self.pixel_x + eye_offset
-            eye_y = self.pixel_y + eye_offset
-        
-        pygame.draw.circle(screen, BLACK, (int(eye_x), int(eye_y)), 2)
+    def draw(self, screen, offset=(0, 0)):
+        """Draw Pacman with mouth animation (one blit of a cached frame)"""
+        frame = sprites.pacman_frame(self.radius, self.direction, self.mouth_angle)
+        screen.blit(frame, (int(self.pixel_x) - self.radius - 1 - offset[0],
+                            int(self.pixel_y) - self.radius - 1 - offset[1]))
+    
+    def sprite_rect(self):
+        """World pixel area covered by the drawn sprite"""
+        size = 2 * self.radius + 2
+        return sprites.rect(int(self.pixel_x) - self.radius - 1, int(self.pixel_y) - self.radius - 1, size, size)
     
     def get_grid_position(self):
         """Get current grid position"""
@@ -177,4 +135,18 @@ class Pacman:
             self.pixel_y = self.grid_y * CELL_SIZE + CELL_SIZE // 2
             self.direction = STOP
             self.next_direction = STOP
-            self.rect.center = (self.pixel_x, self.pixel_y)
+    
+    def reset(self):
+        """Reset Pacman for a new game"""
+        self.reset_position()
+        self.mouth_angle = 0
+        self.mouth_speed = 8
+    
+    def get_state(self):
+        """Get Pacman's state as a tuple of STATE_FIELDS"""
+        return _get_state(self)
+    
+    def set_state(self, state):
+        """Restore a state tuple from get_state"""
+        (self.pixel_x, self.pixel_y, self.grid_x, self.grid_y, self.direction,
+         self.next_direction, self.mouth_angle, self.mouth_speed) = state
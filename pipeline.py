@@ -0,0 +1,164 @@
+"""
+Simulation/render pipelining: the game ticks on one thread while the main
+thread draws and presents.
+
+After each batch of ticks the simulation thread captures an immutable
+FrameSnapshot (HUD values, Pacman and ghost state tuples, and the pellets
+eaten since the previous snapshot) and publishes it to a FrameBuffer. The
+main thread, which keeps the pygame display and event handling, takes the
+latest snapshot and applies it to a FrameWorld: its own maze, Pacman and
+ghosts, so drawing never reads objects the other thread is changing.
+
+The buffer holds one pending snapshot besides the one being drawn. If the
+simulation publishes again before the renderer took the last one, the two
+are merged so no eaten pellet is lost.
+"""
+
+import random
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from config import *
+from maze import Maze
+from pacman import Pacman
+from ghost import Ghost
+from simulation import DEFAULT_PACMAN_START
+
+# `eaten` are cell indices emptied since the previous snapshot; `pellets` is the
+# whole pellet grid (bytes) when it was refilled or restored, else None
+FrameSnapshot = namedtuple("FrameSnapshot", ("tick", "state", "score", "lives", "level", "power_pellet_timer",
+                                             "pacman", "ghosts", "eaten", "pellets"))
+
+
+class FrameCapture:
+    """Takes frame snapshots of a simulation, tracking pellets between them"""
+
+    def __init__(self, sim):
+        self.sim = sim
+        self._pellets = None  # Pellet grid at the last snapshot
+
+    def capture(self):
+        sim = self.sim
+        grid = bytes(sim.maze.pellet_grid)
+        eaten = ()
+        pellets = None
+        if self._pellets is None:
+            pellets = grid
+        elif grid != self._pellets:
+            old = np.frombuffer(self._pellets, dtype=np.uint8)
+            new = np.frombuffer(grid, dtype=np.uint8)
+            changed = np.flatnonzero(old != new)
+            if new[changed].any():
+                # Pellets came back (new level, reset or replay seek): send them all
+                pellets = grid
+            else:
+                eaten = tuple(changed.tolist())
+        self._pellets = grid
+        return FrameSnapshot(sim.ticks, sim.state, sim.score, sim.lives, sim.level, sim.power_pellet_timer,
+                             sim.pacman.get_state(), tuple([ghost.get_state() for ghost in sim.ghosts]),
+                             eaten, pellets)
+
+
+def merge_frames(older, newer):
+    """One snapshot with the effect of applying older and then newer"""
+    if newer.pellets is not None:
+        return newer
+    return newer._replace(eaten=older.eaten + newer.eaten, pellets=older.pellets)
+
+
+class FrameBuffer:
+    """Hands the latest snapshot from the simulation thread to the render thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = None
+
+    def publish(self, frame):
+        with self._lock:
+            if self._pending is not None:
+                frame = merge_frames(self._pending, frame)
+            self._pending = frame
+
+    def take(self):
+        """The snapshot published since the last take, or None"""
+        with self._lock:
+            frame = self._pending
+            self._pending = None
+            return frame
+
+
+class FrameWorld:
+    """The render thread's copy of the world, updated from snapshots.
+
+    It has the attributes draw_world and the HUD read from a Simulation.
+    """
+
+    def __init__(self, sim):
+        self.maze = Maze(sim.layout)
+        start = self.maze.pacman_start or DEFAULT_PACMAN_START
+        self.pacman = Pacman(start[0], start[1], self.maze)
+        # Never updated, so their random choices do not matter
+        rng = random.Random(0)
+        self.ghosts = [Ghost(ghost.start_x, ghost.start_y, ghost.color, self.maze, rng=rng)
+                       for ghost in sim.ghosts]
+        self.tick = self.state = self.score = self.lives = self.level = self.power_pellet_timer = 0
+
+    def apply(self, frame):
+        """Bring the world up to a snapshot"""
+        (self.tick, self.state, self.score, self.lives, self.level,
+         self.power_pellet_timer) = frame[:6]
+        self.pacman.set_state(frame.pacman)
+        for ghost, state in zip(self.ghosts, frame.ghosts):
+            ghost.set_state(state)
+
+        maze = self.maze
+        if frame.pellets is not None:
+            pellets = bytearray(frame.pellets)
+            maze.restore_pellets(pellets, len(pellets) - pellets.count(0))
+        width = maze.width
+        for index in frame.eaten:
+            x, y = index % width, index // width
+            maze.remove_pellet(x, y)
+            maze.remove_power_pellet(x, y)
+
+
+class SimulationThread(threading.Thread):
+    """Runs a Game's ticks at its speed and publishes a snapshot after each batch.
+
+    The main thread holds `lock` while it handles input, since that changes
+    the simulation too.
+    """
+
+    def __init__(self, game, buffer):
+        super().__init__(name="simulation", daemon=True)
+        self.game = game
+        self.buffer = buffer
+        self.lock = threading.Lock()
+        self.capture = FrameCapture(game.sim)
+        self.running = True
+        buffer.publish(self.capture.capture())
+
+    def run(self):
+        game = self.game
+        # Same fixed-timestep accumulator as Game.run
+        accumulator = 0.0
+        last_time = time.perf_counter()
+        while self.running:
+            current_time = time.perf_counter()
+            accumulator += min(current_time - last_time, MAX_FRAME_SECONDS) * game.speed
+            last_time = current_time
+
+            with self.lock:
+                while accumulator >= TICK_SECONDS:
+                    game.update()
+                    accumulator -= TICK_SECONDS
+                # Also published while paused, so input that changes the state shows up
+                self.buffer.publish(self.capture.capture())
+
+            # Sleep until the next tick is due
+            time.sleep((TICK_SECONDS - accumulator) / game.speed)
+
+    def stop(self):
+        self.running = False
+        self.join()
@@ -0,0 +1,144 @@
+"""
+Low-resolution pixel observations, rendered offscreen.
+
+The world is drawn with the game's own drawing code (game.draw_world) onto
+an offscreen surface the size of the maze (or of the screen, following
+Pacman, on bigger mazes) and scaled into a small surface, 84x84 by
+default. The frame is a NumPy view of that surface's pixels through
+pygame.surfarray, so reading it copies nothing.
+
+PixelEnv adds frame-skip (each action is held for several ticks and only
+the last one is rendered) and frame-stacking (the last few frames, oldest
+first, in one preallocated array). No window is ever opened.
+
+Usage: python pixels.py [--frames N] [--size 84x84] [--skip 4] [--stack 4]
+"""
+
+import argparse
+import os
+import time
+
+# Must be set before pygame opens a display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from config import *
+from game import draw_world, follow_camera
+from mazegen import parse_size
+
+DEFAULT_SIZE = (84, 84)
+
+
+class PixelRenderer:
+    """Draws a simulation's world into a small offscreen surface.
+
+    `size` is the frame size in pixels; None gives one pixel per maze cell
+    in view (the whole maze, or the screen's worth around Pacman on bigger
+    mazes).
+    With `smooth` the world is averaged down (pellets stay visible as dim
+    pixels); without it pixels are just sampled, which is faster but can
+    drop small details.
+    """
+
+    def __init__(self, sim, size=DEFAULT_SIZE, smooth=True):
+        self.sim = sim
+        maze = sim.maze
+        self.view_size = (min(maze.width * CELL_SIZE, SCREEN_WIDTH), min(maze.height * CELL_SIZE, SCREEN_HEIGHT))
+        self.size = size if size is not None else (self.view_size[0] // CELL_SIZE, self.view_size[1] // CELL_SIZE)
+        self.scale = pygame.transform.smoothscale if smooth else pygame.transform.scale
+
+        # 32-bit surfaces, which both scalers accept
+        self.world = pygame.Surface(self.view_size, 0, 32)
+        self.surface = pygame.Surface(self.size, 0, 32)
+        # (height, width, 3) view of the frame's pixels; the surface stays locked while it exists
+        self.frame = pygame.surfarray.pixels3d(self.surface).transpose(1, 0, 2)
+        self.frame.flags.writeable = False
+
+    def render(self):
+        """Draw the current state and return the frame (the same live view every time)"""
+        sim = self.sim
+        # No clearing needed: the view never extends past the maze, whose chunks are opaque
+        camera = follow_camera((sim.pacman.pixel_x, sim.pacman.pixel_y), sim.maze, self.view_size)
+        draw_world(self.world, sim, camera)
+        self.scale(self.world, self.size, self.surface)
+        return self.frame
+
+
+class FrameStack:
+    """The last n frames, oldest first, in one preallocated array"""
+
+    def __init__(self, frame_shape, n):
+        self.frames = np.zeros((n,) + tuple(frame_shape), dtype=np.uint8)
+        self.view = self.frames.view()
+        self.view.flags.writeable = False
+
+    def reset(self, frame):
+        """Fill every slot with the same frame, as at the start of an episode"""
+        self.frames[:] = frame
+
+    def push(self, frame):
+        """Drop the oldest frame and append a new one"""
+        frames = self.frames
+        for i in range(len(frames) - 1):
+            frames[i] = frames[i + 1]
+        frames[-1] = frame
+
+
+class PixelEnv:
+    """A simulation seen through stacked low-resolution frames"""
+
+    def __init__(self, sim, size=DEFAULT_SIZE, frame_skip=4, stack=4, smooth=True):
+        self.sim = sim
+        self.frame_skip = frame_skip
+        self.renderer = PixelRenderer(sim, size, smooth)
+        self.stack = FrameStack(self.renderer.frame.shape, stack)
+
+    def reset(self, seed=None):
+        """Start a new game; returns the stacked frames (a read-only (stack, height, width, 3) view)"""
+        self.sim.reset(seed)
+        self.stack.reset(self.renderer.render())
+        return self.stack.view
+
+    def step(self, action=None):
+        """Hold an action for frame_skip ticks; returns (frames, reward, done)"""
+        total = 0
+        done = False
+        for _ in range(self.frame_skip):
+            reward, done = self.sim.step(action)
+            total += reward
+            if done:
+                break
+        self.stack.push(self.renderer.render())
+        return self.stack.view, total, done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure headless pixel rollout speed")
+    parser.add_argument("--frames", type=int, default=2000, help="observations to produce")
+    parser.add_argument("--size", type=parse_size, default=DEFAULT_SIZE, help="frame size, e.g. 84x84")
+    parser.add_argument("--skip", type=int, default=4, help="ticks per observation")
+    parser.add_argument("--stack", type=int, default=4, help="frames per observation")
+    parser.add_argument("--sharp", action="store_true", help="sample pixels instead of averaging them")
+    parser.add_argument("--seed", type=int, default=0, help="game seed")
+    args = parser.parse_args()
+
+    from rollout import RandomPolicy
+    from simulation import Simulation
+
+    env = PixelEnv(Simulation(args.seed), args.size, args.skip, args.stack, smooth=not args.sharp)
+    policy = RandomPolicy()
+    policy.reset(args.seed)
+    env.reset(args.seed)
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        _, _, done = env.step(policy(env.sim))
+        if done:
+            env.reset()
+    elapsed = time.perf_counter() - start
+    print(f"{args.frames / elapsed:.0f} observations/s, {args.frames * args.skip / elapsed:.0f} ticks/s "
+          f"({args.size[0]}x{args.size[1]}, skip {args.skip}, stack {args.stack})")
+
+
+if __name__ == "__main__":
+    main()
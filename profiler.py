@@ -0,0 +1,121 @@
+"""
+Frame-phase profiler.
+
+Code marks the end of each phase of a frame with `mark(phase)`. The time
+since the previous mark is charged to that phase. Per-frame totals go into
+a fixed-size ring buffer for rolling percentiles, and every marked span
+goes into a second ring that can be written out as a Chrome trace
+(chrome://tracing or https://ui.perfetto.dev).
+
+Profiling is off unless a Profiler is attached; the instrumented code only
+checks `profiler is not None`.
+"""
+
+import json
+import time
+from array import array
+
+# Phases in display order; "update" is simulation work outside the named parts
+PHASES = ("events", "update", "pacman", "ghosts", "collisions", "maze", "sprites", "ui", "flip")
+FRAME = len(PHASES)  # Slot for the whole frame
+PHASE_NAMES = PHASES + ("frame",)
+
+DEFAULT_FRAMES = 600  # Ten seconds of frames at 60 FPS
+DEFAULT_SPANS = 65536
+
+
+class Profiler:
+    """Low-overhead timers for the phases of each frame"""
+
+    def __init__(self, frames=DEFAULT_FRAMES, spans=DEFAULT_SPANS):
+        self.clock = time.perf_counter
+        self._index = {name: i for i, name in enumerate(PHASE_NAMES)}
+        self._slots = len(PHASE_NAMES)
+
+        # Per-frame totals, one row of seconds per frame
+        self.frames = frames
+        self.frame_count = 0
+        self._totals = array("d", bytes(8 * frames * self._slots))
+        self._current = [0.0] * self._slots
+
+        # Individual spans for the trace: (phase, start, duration) triples
+        self.spans = spans
+        self.span_count = 0
+        self._spans = array("d", bytes(8 * spans * 3))
+
+        self._origin = self.clock()
+        self._frame_start = self._last = self._origin
+
+    def start_frame(self):
+        """Begin timing a new frame"""
+        self._frame_start = self._last = self.clock()
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to a phase"""
+        now = self.clock()
+        index = self._index[phase]
+        self._current[index] += now - self._last
+        self._record_span(index, self._last, now)
+        self._last = now
+
+    def end_frame(self):
+        """Finish the frame, storing its phase totals in the ring buffer"""
+        now = self.clock()
+        current = self._current
+        current[FRAME] = now - self._frame_start
+        self._record_span(FRAME, self._frame_start, now)
+
+        row = (self.frame_count % self.frames) * self._slots
+        self._totals[row:row + self._slots] = array("d", current)
+        self.frame_count += 1
+        for i in range(self._slots):
+            current[i] = 0.0
+
+    def _record_span(self, index, start, end):
+        slot = (self.span_count % self.spans) * 3
+        spans = self._spans
+        spans[slot] = index
+        spans[slot + 1] = start - self._origin
+        spans[slot + 2] = end - start
+        self.span_count += 1
+
+    def percentiles(self, *quantiles):
+        """{phase: [milliseconds per quantile]} over the frames in the ring buffer"""
+        count = min(self.frame_count, self.frames)
+        stats = {}
+        for i, name in enumerate(PHASE_NAMES):
+            values = sorted(self._totals[row * self._slots + i] for row in range(count))
+            if not values:
+                stats[name] = [0.0 for _ in quantiles]
+                continue
+            stats[name] = [values[min(int(q * len(values)), len(values) - 1)] * 1000
+                           for q in quantiles]
+        return stats
+
+    def summary(self):
+        """Text lines with the rolling p50 and p99 of every phase"""
+        lines = [f"{'phase':<11}{'p50 ms':>8}{'p99 ms':>8}"]
+        for name, (p50, p99) in self.percentiles(0.5, 0.99).items():
+            lines.append(f"{name:<11}{p50:8.2f}{p99:8.2f}")
+        return lines
+
+    def write_trace(self, path):
+        """Write the recorded spans as a Chrome trace JSON file"""
+        count = min(self.span_count, self.spans)
+        first = self.span_count - count
+        events = []
+        for n in range(first, first + count):
+            slot = (n % self.spans) * 3
+            index = int(self._spans[slot])
+            events.append({
+                "name": PHASE_NAMES[index],
+                "cat": "frame" if index == FRAME else "phase",
+                "ph": "X",
+                "ts": self._spans[slot + 1] * 1e6,
+                "dur": self._spans[slot + 2] * 1e6,
+                "pid": 1,
+                # Frames and phases on separate rows so phases nest visibly
+                "tid": 1 if index == FRAME else 2,
+            })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
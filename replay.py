@@ -0,0 +1,229 @@
+"""
+Replay recording and playback.
+
+A replay stores the game seed and the Pacman input of every tick,
+run-length encoded, plus periodic keyframe snapshots so playback can seek
+without re-simulating from the start. File layout (little endian):
+
+    header     magic "PMRP", version, seed, layout SHA-1, ticks, runs, keyframes
+    runs       input code (u8) and run length (u16), one pair per run
+    keyframes  tick (u32), size (u32) and a zlib-compressed snapshot each
+
+A snapshot is packed field by field with fixed struct layouts (see
+pack_snapshot), so loading a replay never runs code from the file:
+
+    game       state, score, lives, level, ticks, pellets eaten, power pellet and
+               mode timers (i64 each), scatter mode (bool), RNG state (u64)
+    pellets    pellets remaining (u32), grid size (u32), then the grid bytes
+    pacman     pixel and grid position (i32), direction and next direction
+               codes (u8), mouth angle and speed (i32)
+    ghosts     count (u16), then per ghost: start and pixel position (i32,
+               f64), grid position (i32), direction and target mode codes
+               (u8), speed (f64), frightened (bool), frightened timer (i32),
+               eaten (bool)
+
+Usage: python replay.py FILE [--maze FILE | --random-maze WxH --maze-seed N]
+       (re-simulate headlessly at maximum speed, on the maze it was recorded on)
+"""
+
+import argparse
+import bisect
+import struct
+import time
+import zlib
+from config import *
+from simulation import Simulation
+from mazegen import add_maze_arguments, layout_from_args
+
+MAGIC = b"PMRP"
+VERSION = 3
+HEADER = struct.Struct("<4sHq20sIII")
+RUN = struct.Struct("<BH")
+KEYFRAME = struct.Struct("<II")
+GAME_STATE = struct.Struct("<8q?Q")
+PELLETS = struct.Struct("<II")
+PACMAN_STATE = struct.Struct("<4iBB2i")
+GHOST_COUNT = struct.Struct("<H")
+GHOST_STATE = struct.Struct("<2i2d2iBBd?i?")
+MAX_RUN = 0xFFFF
+KEYFRAME_INTERVAL = FPS * 10  # Ticks between keyframes
+
+# Per-tick input codes; None means no new direction was pressed
+INPUTS = (None, UP, DOWN, LEFT, RIGHT, STOP)
+INPUT_CODES = {direction: code for code, direction in enumerate(INPUTS)}
+# Ghost target modes in snapshots
+TARGET_MODES = ("chase", "scatter", "random")
+TARGET_MODE_CODES = {mode: code for code, mode in enumerate(TARGET_MODES)}
+
+
+def pack_snapshot(snapshot):
+    """Encode a Simulation.snapshot as bytes"""
+    state, rng_state, pellet_grid, pellets_remaining, pacman_state, ghost_states = snapshot
+    parts = [GAME_STATE.pack(*state, rng_state),
+             PELLETS.pack(pellets_remaining, len(pellet_grid)), bytes(pellet_grid)]
+    pixel_x, pixel_y, grid_x, grid_y, direction, next_direction, mouth_angle, mouth_speed = pacman_state
+    parts.append(PACMAN_STATE.pack(pixel_x, pixel_y, grid_x, grid_y, INPUT_CODES[direction],
+                                   INPUT_CODES[next_direction], mouth_angle, mouth_speed))
+    parts.append(GHOST_COUNT.pack(len(ghost_states)))
+    for (start_x, start_y, pixel_x, pixel_y, grid_x, grid_y, direction, target_mode, speed,
+         frightened, frightened_timer, eaten) in ghost_states:
+        parts.append(GHOST_STATE.pack(start_x, start_y, pixel_x, pixel_y, grid_x, grid_y,
+                                      INPUT_CODES[direction], TARGET_MODE_CODES[target_mode], speed,
+                                      frightened, frightened_timer, eaten))
+    return b"".join(parts)
+
+
+def unpack_snapshot(data):
+    """Decode bytes from pack_snapshot into a snapshot for Simulation.restore"""
+    fields = GAME_STATE.unpack_from(data)
+    state, rng_state = fields[:-1], fields[-1]
+    offset = GAME_STATE.size
+    pellets_remaining, grid_size = PELLETS.unpack_from(data, offset)
+    offset += PELLETS.size
+    pellet_grid = bytearray(data[offset:offset + grid_size])
+    offset += grid_size
+
+    (pixel_x, pixel_y, grid_x, grid_y, direction, next_direction,
+     mouth_angle, mouth_speed) = PACMAN_STATE.unpack_from(data, offset)
+    pacman_state = (pixel_x, pixel_y, grid_x, grid_y, INPUTS[direction], INPUTS[next_direction],
+                    mouth_angle, mouth_speed)
+    offset += PACMAN_STATE.size
+
+    count, = GHOST_COUNT.unpack_from(data, offset)
+    offset += GHOST_COUNT.size
+    ghost_states = []
+    for _ in range(count):
+        (start_x, start_y, pixel_x, pixel_y, grid_x, grid_y, direction, target_mode, speed,
+         frightened, frightened_timer, eaten) = GHOST_STATE.unpack_from(data, offset)
+        ghost_states.append((start_x, start_y, pixel_x, pixel_y, grid_x, grid_y, INPUTS[direction],
+                             TARGET_MODES[target_mode], speed, frightened, frightened_timer, eaten))
+        offset += GHOST_STATE.size
+    return state, rng_state, pellet_grid, pellets_remaining, pacman_state, tuple(ghost_states)
+
+
+class ReplayRecorder:
+    """Record a game tick by tick as it is played"""
+
+    def __init__(self, sim):
+        self.seed = sim.seed
+        self.layout_hash = sim.maze.layout_hash
+        self.inputs = bytearray()
+        self.keyframes = []
+
+    def record(self, sim, action):
+        """Record the input for the tick the simulation is about to run"""
+        if len(self.inputs) % KEYFRAME_INTERVAL == 0:
+            self.keyframes.append((len(self.inputs), sim.snapshot()))
+        self.inputs.append(INPUT_CODES[action])
+
+    def save(self, path):
+        """Write the recording to a replay file"""
+        runs = []
+        for code in self.inputs:
+            if runs and runs[-1][0] == code and runs[-1][1] < MAX_RUN:
+                runs[-1][1] += 1
+            else:
+                runs.append([code, 1])
+
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, bytes.fromhex(self.layout_hash),
+                                len(self.inputs), len(runs), len(self.keyframes)))
+            for code, length in runs:
+                f.write(RUN.pack(code, length))
+            for tick, snapshot in self.keyframes:
+                blob = zlib.compress(pack_snapshot(snapshot))
+                f.write(KEYFRAME.pack(tick, len(blob)))
+                f.write(blob)
+
+
+class ReplayPlayer:
+    """Re-simulate a recorded game, with keyframe-based seeking"""
+
+    def __init__(self, seed, layout_hash, inputs, keyframes, sim=None):
+        self.seed = seed
+        self.inputs = inputs
+        self.keyframe_ticks = [tick for tick, _ in keyframes]
+        self.keyframe_blobs = [blob for _, blob in keyframes]
+
+        self.sim = sim if sim is not None else Simulation(seed)
+        if self.sim.maze.layout_hash != layout_hash:
+            raise ValueError("Replay was recorded on a different maze layout; play it on the maze it was recorded on")
+        self.sim.reset(seed)
+        self.tick = 0
+
+    @classmethod
+    def load(cls, path, sim=None):
+        """Read a replay file"""
+        with open(path, "rb") as f:
+            data = f.read()
+
+        magic, version, seed, digest, ticks, run_count, keyframe_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay file")
+        offset = HEADER.size
+
+        inputs = bytearray()
+        for code, length in RUN.iter_unpack(data[offset:offset + run_count * RUN.size]):
+            inputs += bytes((code,)) * length
+        offset += run_count * RUN.size
+
+        keyframes = []
+        for _ in range(keyframe_count):
+            tick, size = KEYFRAME.unpack_from(data, offset)
+            offset += KEYFRAME.size
+            keyframes.append((tick, data[offset:offset + size]))
+            offset += size
+
+        return cls(seed, digest.hex(), inputs[:ticks], keyframes, sim)
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def step(self):
+        """Play the next recorded tick; returns False once the replay is over"""
+        if self.tick >= len(self.inputs):
+            return False
+        self.sim.step(INPUTS[self.inputs[self.tick]])
+        self.tick += 1
+        return True
+
+    def seek(self, tick):
+        """Jump to a tick, restoring the closest keyframe before it"""
+        tick = max(0, min(tick, len(self.inputs)))
+        index = bisect.bisect_right(self.keyframe_ticks, tick) - 1
+        if index >= 0 and (tick < self.tick or self.keyframe_ticks[index] > self.tick):
+            self.sim.restore(unpack_snapshot(zlib.decompress(self.keyframe_blobs[index])))
+            self.tick = self.keyframe_ticks[index]
+        elif tick < self.tick:
+            self.sim.reset(self.seed)
+            self.tick = 0
+        while self.tick < tick:
+            self.step()
+
+    def run_to_end(self):
+        """Re-simulate the rest of the replay as fast as possible"""
+        while self.step():
+            pass
+        return self.sim
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-simulate a replay headlessly at maximum speed")
+    parser.add_argument("replay", metavar="FILE", help="replay file")
+    add_maze_arguments(parser)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sim = Simulation(layout=layout_from_args(args))
+    try:
+        player = ReplayPlayer.load(args.replay, sim)
+    except ValueError as e:
+        parser.error(str(e))
+    sim = player.run_to_end()
+    elapsed = time.perf_counter() - start
+    print(f"{len(player)} ticks in {elapsed * 1000:.0f} ms: score {sim.score}, level {sim.level}, "
+          f"lives {sim.lives}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Rollout runner - evaluate a Pacman controller over many seeded episodes.
+
+Episodes run headlessly in a process pool. Each worker builds one
+Simulation and resets it between episodes, and results stream back as
+soon as each episode finishes.
+
+Usage: python rollout.py --episodes 1000 --workers 8
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import *
+
+MAX_EPISODE_TICKS = FPS * 60 * 10  # Ten minutes of play
+
+# Per-process state, set up once by _init_worker
+_sim = None
+_policy = None
+
+
+class RandomPolicy:
+    """Baseline controller: picks a random direction every few ticks"""
+
+    def __init__(self, change_every=8):
+        self.change_every = change_every
+        self.rng = random.Random()
+        self.action = STOP
+
+    def reset(self, seed):
+        self.rng.seed(seed)
+
+    def __call__(self, sim):
+        if sim.ticks % self.change_every == 0:
+            self.action = self.rng.choice([UP, DOWN, LEFT, RIGHT])
+        return self.action
+
+
+def _init_worker(policy):
+    """Build the worker's simulation once; it is reset for every episode"""
+    # Headless workers must never open a window, even if something imports the display
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    from simulation import Simulation
+
+    global _sim, _policy
+    _sim = Simulation()
+    _policy = policy
+
+
+def _run_episode(seed, max_ticks):
+    """Play one episode in this worker and summarise it"""
+    sim = _sim
+    sim.reset(seed)
+    if hasattr(_policy, "reset"):
+        _policy.reset(seed)
+
+    done = False
+    while not done and sim.ticks < max_ticks:
+        _, done = sim.step(_policy(sim))
+
+    return {
+        "seed": seed,
+        "score": sim.score,
+        "level": sim.level,
+        "ticks": sim.ticks,
+        "pellets_eaten": sim.pellets_eaten,
+        "game_over": done,
+    }
+
+
+def run_rollouts(seeds, policy=None, workers=None, max_ticks=MAX_EPISODE_TICKS):
+    """Run one episode per seed across a process pool.
+
+    `policy` is a picklable callable taking the Simulation and returning a
+    direction (or None); if it has a reset(seed) method that is called at
+    the start of every episode. Yields result dicts as episodes finish, so
+    they arrive in completion order, not seed order.
+    """
+    policy = policy if policy is not None else RandomPolicy()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(policy,)) as pool:
+        futures = [pool.submit(_run_episode, seed, max_ticks) for seed in seeds]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a Pacman controller over seeded episodes")
+    parser.add_argument("--episodes", type=int, default=100, help="number of episodes to run")
+    parser.add_argument("--first-seed", type=int, default=0, help="seed of the first episode")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-ticks", type=int, default=MAX_EPISODE_TICKS, help="tick limit per episode")
+    args = parser.parse_args()
+
+    seeds = range(args.first_seed, args.first_seed + args.episodes)
+    start = time.perf_counter()
+    results = []
+    for result in run_rollouts(seeds, workers=args.workers, max_ticks=args.max_ticks):
+        results.append(result)
+        print(f"seed {result['seed']}: score {result['score']}, level {result['level']}, "
+              f"{result['ticks']} ticks, {result['pellets_eaten']} pellets")
+
+    elapsed = time.perf_counter() - start
+    total_ticks = sum(result["ticks"] for result in results)
+    mean_score = sum(result["score"] for result in results) / max(len(results), 1)
+    print(f"{len(results)} episodes in {elapsed:.1f}s ({total_ticks / elapsed:.0f} ticks/s), "
+          f"mean score {mean_score:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import random
+from operator import attrgetter
+from config import *
+from maze import Maze
+from pacman import Pacman
+from ghost import Ghost
+from rng import GameRandom
+from spatial import SpatialHash
+
+GHOST_COLORS = [RED, PINK, CYAN, ORANGE]
+GHOST_MODES = ["chase", "scatter", "chase", "random"]
+DEFAULT_PACMAN_START = (9, 15)
+DEFAULT_GHOST_STARTS = [(9, 9), (10, 9), (9, 10), (10, 10)]
+# With fewer ghosts, testing them all is cheaper than keeping the spatial index up to date
+SPATIAL_INDEX_MIN_GHOSTS = 16
+
+# Attributes captured by Simulation.snapshot, besides the maze and entities
+_get_state = attrgetter("state", "score", "lives", "level", "ticks", "pellets_eaten",
+                        "power_pellet_timer", "mode_timer", "scatter_mode")
+
+
+def ghost_start_positions(maze):
+    """Ghost start cells from the maze, or the default ghost house"""
+    if maze.ghost_starts and len(maze.ghost_starts) >= 4:
+        return maze.ghost_starts[:4]
+    return DEFAULT_GHOST_STARTS
+
+
+class Simulation:
+    """Headless game world: maze, Pacman, ghosts and the rules between them.
+
+    Never touches a window, clock or renderer, so it can be stepped as fast
+    as the CPU allows. `Game` wraps one of these for interactive play.
+    """
+
+    def __init__(self, seed=None, layout=None):
+        self.layout = layout  # Maze layout rows; None for the classic maze
+        self.pacman = None
+        self.ghosts = []
+        self.profiler = None  # Optional profiler.Profiler timing each part of a tick
+        self.observer = None  # observation.ObservationPlanes, created by the first observe()
+        # Ghosts bucketed by position, so collision checks only look near Pacman
+        self.ghost_grid = SpatialHash()
+        self._ghost_order = {}
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Start a fresh game, seeding the ghost RNG.
+
+        Without a seed a random one is picked (and kept in self.seed), so
+        every game can be reproduced. Pacman and the ghosts are built once
+        and reset in place afterwards.
+        """
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.rng = GameRandom(seed)
+        self.state = PLAYING
+        self.score = 0
+        self.lives = 3
+        self.level = 1
+        self.ticks = 0
+        self.pellets_eaten = 0
+
+        if self.pacman is None:
+            self.maze = Maze(self.layout)
+            ghost_positions = ghost_start_positions(self.maze)
+            start = self.maze.pacman_start or DEFAULT_PACMAN_START
+            self.pacman = Pacman(start[0], start[1], self.maze)
+            for i, (color, mode) in enumerate(zip(GHOST_COLORS, GHOST_MODES)):
+                x, y = ghost_positions[i]
+                self.ghosts.append(Ghost(x, y, color, self.maze, mode, self.rng))
+        else:
+            # Same layout, so the maze and start cells stay; only the pellets come back
+            self.maze.reset()
+            self.pacman.reset()
+            for i, ghost in enumerate(self.ghosts):
+                ghost.reset(GHOST_MODES[i % len(GHOST_MODES)], self.rng)
+
+        self._reset_timers()
+        self._index_ghosts()
+        if self.observer is not None:
+            self.observer.rebuild()
+
+    def observe(self):
+        """Get the observation planes (see observation.py) as a read-only array.
+
+        The same array is returned every time and stays current as the game
+        is stepped, so nothing is copied or rebuilt per tick.
+        """
+        if self.observer is None:
+            # Imported here so games that never observe do not need NumPy
+            from observation import ObservationPlanes
+            self.observer = ObservationPlanes(self)
+        return self.observer.view
+
+    def add_ghost(self):
+        """Add another ghost, cycling through the four colours, modes and start cells"""
+        i = len(self.ghosts)
+        ghost_positions = ghost_start_positions(self.maze)
+        x, y = ghost_positions[i % len(ghost_positions)]
+        ghost = Ghost(x, y, GHOST_COLORS[i % len(GHOST_COLORS)], self.maze,
+                      GHOST_MODES[i % len(GHOST_MODES)], self.rng)
+        self.ghosts.append(ghost)
+        self._index_ghosts()
+        return ghost
+
+    def _reset_timers(self):
+        self.power_pellet_timer = 0
+        self.mode_timer = 0
+        self.mode_duration = MODE_TICKS
+        self.scatter_mode = True
+
+    def step(self, action=None):
+        """Advance the world by one fixed tick.
+
+        `action` is a direction to queue for Pacman (None keeps the current
+        one). Returns (reward, done) where reward is the score gained. The
+        same seed and actions always give the same trajectory.
+        """
+        if self.state != PLAYING:
+            return 0, self.state == GAME_OVER
+
+        if action is not None:
+            self.pacman.set_direction(action)
+
+        score_before = self.score
+        self.update()
+        return self.score - score_before, self.state == GAME_OVER
+
+    def update(self):
+        """Update game logic by one tick"""
+        if self.state != PLAYING:
+            return
+
+        self.ticks += 1
+
+        # Update mode timer for ghost behavior (in ticks)
+        self.mode_timer += 1
+        if self.mode_timer >= self.mode_duration:
+            self.scatter_mode = not self.scatter_mode
+            self.mode_timer = 0
+            # Update ghost modes
+            for ghost in self.ghosts:
+                if not ghost.frightened and not ghost.eaten:
+                    ghost.target_mode = "scatter" if self.scatter_mode else "chase"
+
+        # Update power pellet timer (in ticks)
+        if self.power_pellet_timer > 0:
+            self.power_pellet_timer -= 1
+            if self.power_pellet_timer <= 0:
+                # End frightened mode for all ghosts
+                for ghost in self.ghosts:
+                    ghost.frightened = False
+
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.mark("update")
+
+        # Update Pacman
+        self.pacman.update()
+        if profiler is not None:
+            profiler.mark("pacman")
+
+        # Update ghosts
+        pacman_pos = self.pacman.get_grid_position()
+        if len(self.ghosts) >= SPATIAL_INDEX_MIN_GHOSTS:
+            ghost_grid = self.ghost_grid
+            for ghost in self.ghosts:
+                ghost.update(pacman_pos)
+                ghost_grid.move(ghost)
+        else:
+            for ghost in self.ghosts:
+                ghost.update(pacman_pos)
+        if profiler is not None:
+            profiler.mark("ghosts")
+
+        # Check collisions
+        self.check_collisions()
+        if profiler is not None:
+            profiler.mark("collisions")
+
+        # Check win condition
+        if self.maze.all_pellets_eaten():
+            self.next_level()
+
+        if self.observer is not None:
+            self.observer.update()
+
+    def check_collisions(self):
+        """Check for collisions between game objects"""
+        # Get Pacman's grid position for more accurate collision detection
+        pacman_grid_x = int(self.pacman.pixel_x // CELL_SIZE)
+        pacman_grid_y = int(self.pacman.pixel_y // CELL_SIZE)
+
+        # Check pellet collisions (one cell lookup each)
+        pellet_score = self.maze.remove_pellet(pacman_grid_x, pacman_grid_y)
+        if pellet_score:
+            self.score += pellet_score
+            self.pellets_eaten += 1
+            if self.observer is not None:
+                self.observer.pellet_eaten(pacman_grid_x, pacman_grid_y)
+
+        # Check power pellet collisions
+        power_score = self.maze.remove_power_pellet(pacman_grid_x, pacman_grid_y)
+        if power_score:
+            self.score += power_score
+            self.pellets_eaten += 1
+            if self.observer is not None:
+                self.observer.pellet_eaten(pacman_grid_x, pacman_grid_y)
+            # Activate power mode
+            self.power_pellet_timer = POWER_PELLET_TICKS
+            for ghost in self.ghosts:
+                if not ghost.eaten:
+                    ghost.set_frightened(POWER_PELLET_TICKS)
+
+        # Check ghost collisions, testing only the ghosts near Pacman (or all of a few), in ghost order
+        if len(self._ghost_order) != len(self.ghosts):
+            self._index_ghosts()
+        order = self._ghost_order
+        if len(self.ghosts) >= SPATIAL_INDEX_MIN_GHOSTS:
+            reach = self.pacman.radius + self._max_ghost_radius
+            nearby = self.ghost_grid.query(self.pacman.pixel_x, self.pacman.pixel_y, reach)
+            nearby.sort(key=order.__getitem__)
+        else:
+            nearby = self.ghosts
+        for ghost in nearby:
+            if self._collide_ghost(ghost):
+                # Everyone went back to the start; finish the pass over the later ghosts
+                for later in self.ghosts[order[ghost] + 1:]:
+                    self._collide_ghost(later)
+                break
+
+    def _collide_ghost(self, ghost):
+        """Resolve Pacman touching a ghost; returns True if Pacman died"""
+        reach = self.pacman.radius + ghost.radius - 5  # Slight overlap tolerance
+        dx = self.pacman.pixel_x - ghost.pixel_x
+        dy = self.pacman.pixel_y - ghost.pixel_y
+        if reach <= 0 or dx * dx + dy * dy >= reach * reach:
+            return False
+        if ghost.frightened and not ghost.eaten:
+            # Eat the ghost
+            ghost.eat()
+            self.score += GHOST_SCORE
+        elif not ghost.eaten:
+            # Pacman dies
+            self.pacman_dies()
+            return True
+        return False
+
+    def _index_ghosts(self):
+        """Rebuild the ghost spatial index after ghosts moved outside update()"""
+        self.ghost_grid.clear()
+        if len(self.ghosts) >= SPATIAL_INDEX_MIN_GHOSTS:
+            for ghost in self.ghosts:
+                self.ghost_grid.insert(ghost)
+        self._ghost_order = {ghost: i for i, ghost in enumerate(self.ghosts)}
+        self._max_ghost_radius = max((ghost.radius for ghost in self.ghosts), default=0)
+
+    def pacman_dies(self):
+        """Handle Pacman death"""
+        self.lives -= 1
+        if self.lives <= 0:
+            self.state = GAME_OVER
+        else:
+            # Reset positions
+            self.pacman.reset_position()
+            for ghost in self.ghosts:
+                ghost.reset_position()
+            self.power_pellet_timer = 0
+            self._index_ghosts()
+
+    def next_level(self):
+        """Advance to next level"""
+        self.level += 1
+        self.score += BONUS_SCORE
+
+        # Refill the maze in place and put everyone back on their starts
+        self.maze.reset()
+        self.pacman.reset_position()
+        for ghost in self.ghosts:
+            ghost.reset_position()
+            # Increase ghost speed slightly
+            ghost.speed = min(ghost.speed + 0.1, PACMAN_SPEED - 0.5)
+
+        self._reset_timers()
+        self._index_ghosts()
+
+    def snapshot(self):
+        """Capture the full game state (see restore).
+
+        Snapshots are flat tuples of plain values. The pellet grid is shared
+        with the maze copy-on-write, so taking one costs no copying.
+        """
+        pellet_grid, pellets_remaining = self.maze.share_pellets()
+        return (_get_state(self), self.rng.getstate(), pellet_grid, pellets_remaining,
+                self.pacman.get_state(), tuple([ghost.get_state() for ghost in self.ghosts]))
+
+    def restore(self, snapshot):
+        """Return the game to a state captured by snapshot"""
+        state, rng_state, pellet_grid, pellets_remaining, pacman_state, ghost_states = snapshot
+        (self.state, self.score, self.lives, self.level, self.ticks, self.pellets_eaten,
+         self.power_pellet_timer, self.mode_timer, self.scatter_mode) = state
+        self.rng.setstate(rng_state)
+        self.maze.restore_pellets(pellet_grid, pellets_remaining)
+        self.pacman.set_state(pacman_state)
+        for ghost, ghost_state in zip(self.ghosts, ghost_states):
+            ghost.set_state(ghost_state)
+        self._index_ghosts()
+        if self.observer is not None:
+            self.observer.rebuild()
@@ -0,0 +1,63 @@
+from config import *
+
+
+class SpatialHash:
+    """Uniform grid of buckets over entities, for finding the ones near a point.
+
+    Entities only need pixel_x and pixel_y. move() re-buckets an entity
+    only when it has crossed into another bucket, so keeping the index up
+    to date costs a couple of divisions per moved entity, and a query only
+    looks at the buckets around the point whatever the entity count.
+    """
+
+    def __init__(self, bucket_size=CELL_SIZE):
+        self.bucket_size = bucket_size
+        self._buckets = {}
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _key(self, entity):
+        return int(entity.pixel_x // self.bucket_size), int(entity.pixel_y // self.bucket_size)
+
+    def insert(self, entity):
+        """Add an entity at its current position"""
+        key = self._key(entity)
+        self._keys[entity] = key
+        self._buckets.setdefault(key, []).append(entity)
+
+    def remove(self, entity):
+        """Take an entity out of the index"""
+        key = self._keys.pop(entity)
+        bucket = self._buckets[key]
+        bucket.remove(entity)
+        if not bucket:
+            del self._buckets[key]
+
+    def move(self, entity):
+        """Update an entity's bucket after it moved (inserting it if it is new)"""
+        key = self._key(entity)
+        old_key = self._keys.get(entity)
+        if key != old_key:
+            if old_key is not None:
+                self.remove(entity)
+            self._keys[entity] = key
+            self._buckets.setdefault(key, []).append(entity)
+
+    def clear(self):
+        """Remove every entity"""
+        self._buckets.clear()
+        self._keys.clear()
+
+    def query(self, x, y, radius):
+        """Entities in the buckets overlapping the square of half-size radius around (x, y)"""
+        size = self.bucket_size
+        buckets = self._buckets
+        found = []
+        for bucket_y in range(int((y - radius) // size), int((y + radius) // size) + 1):
+            for bucket_x in range(int((x - radius) // size), int((x + radius) // size) + 1):
+                bucket = buckets.get((bucket_x, bucket_y))
+                if bucket:
+                    found.extend(bucket)
+        return found
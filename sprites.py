@@ -0,0 +1,127 @@
+import math
+from config import *
+
+# pygame is imported on first draw, so the rules can import this module without loading it
+_pygame = None
+
+# Pre-rendered sprite surfaces, keyed by everything that changes their pixels.
+# They are built lazily on first use, so every size and animation frame that
+# is actually drawn costs one render in total and a single blit afterwards.
+_pacman_frames = {}
+_ghost_sprites = {}
+
+
+def load_pygame():
+    """Get the pygame module, importing it on first use"""
+    global _pygame
+    if _pygame is None:
+        import pygame
+        _pygame = pygame
+    return _pygame
+
+
+def rect(left, top, width, height):
+    """Make a pygame Rect"""
+    return load_pygame().Rect(left, top, width, height)
+
+
+def _finish(surface):
+    """Match the display's pixel format when there is a display"""
+    pygame = load_pygame()
+    if pygame.display.get_surface() is not None:
+        return surface.convert_alpha()
+    return surface
+
+
+def pacman_frame(radius, direction, mouth_angle):
+    """Get the cached Pacman sprite for a size, facing and mouth opening.
+
+    The sprite is a square of side 2 * radius + 2 centred on the body, so
+    it is blitted at (x - radius - 1, y - radius - 1).
+    """
+    if direction == STOP or mouth_angle <= 0:
+        mouth_angle = 0
+    key = (radius, direction, mouth_angle)
+    frame = _pacman_frames.get(key)
+    if frame is None:
+        frame = _finish(_render_pacman(radius, direction, mouth_angle))
+        _pacman_frames[key] = frame
+    return frame
+
+
+def _render_pacman(radius, direction, mouth_angle):
+    """Draw one Pacman frame onto a new transparent surface"""
+    pygame = load_pygame()
+    size = 2 * radius + 2
+    center = radius + 1
+    surface = pygame.Surface((size, size), pygame.SRCALPHA)
+
+    if mouth_angle == 0:
+        # Draw full circle when stopped or mouth closed
+        pygame.draw.circle(surface, YELLOW, (center, center), radius)
+    else:
+        # Body polygon around the circle, leaving a wedge open towards the direction
+        facing = math.degrees(math.atan2(direction[1], direction[0]))
+        points = [(center, center)]
+        for angle in range(int(mouth_angle), 360 - int(mouth_angle) + 1):
+            theta = math.radians(facing + angle)
+            points.append((center + radius * math.cos(theta), center + radius * math.sin(theta)))
+        pygame.draw.polygon(surface, YELLOW, points)
+
+    # Eye, above the mouth on the side Pacman is facing
+    eye_offset = max(1, radius // 3)
+    if direction == LEFT:
+        eye = (center - eye_offset, center - eye_offset)
+    elif direction == DOWN:
+        eye = (center + eye_offset, center + eye_offset)
+    else:  # RIGHT, UP or STOP
+        eye = (center + eye_offset, center - eye_offset)
+    pygame.draw.circle(surface, BLACK, eye, max(1, radius // 6))
+    return surface
+
+
+def ghost_sprite(color, radius, state, direction, phase):
+    """Get the cached ghost sprite for a colour, state, facing and wave phase.
+
+    The sprite is 2 * radius + 2 wide and 2 * radius + 6 tall, and is
+    blitted at (x - radius - 1, y - radius - 3).
+    """
+    if state == GHOST_EATEN:
+        color = phase = None  # Just the eyes
+    elif state == GHOST_FRIGHTENED:
+        direction = None  # Frightened eyes don't look anywhere
+    key = (color, radius, state, direction, phase)
+    sprite = _ghost_sprites.get(key)
+    if sprite is None:
+        sprite = _finish(_render_ghost(color, radius, state, direction, phase))
+        _ghost_sprites[key] = sprite
+    return sprite
+
+
+def _render_ghost(color, radius, state, direction, phase):
+    """Draw one ghost sprite onto a new transparent surface"""
+    pygame = load_pygame()
+    surface = pygame.Surface((2 * radius + 2, 2 * radius + 6), pygame.SRCALPHA)
+    x, y = radius + 1, radius + 3  # Ghost position within the sprite
+
+    if state != GHOST_EATEN:
+        body = BLUE if state == GHOST_FRIGHTENED else color
+        # Ghost body (circle top, wavy bottom)
+        pygame.draw.circle(surface, body, (x, y - 2), radius)
+        pygame.draw.rect(surface, body, (x - radius, y - 2, radius * 2, radius + 2))
+        # Wavy bottom edge, alternating between two phases
+        wave = [(x - radius + i * radius // 2, y + radius - (2 if (i + phase) % 2 == 0 else -2))
+                for i in range(5)]
+        pygame.draw.polygon(surface, body, wave)
+
+    if state == GHOST_FRIGHTENED:
+        # Frightened eyes (dots)
+        pygame.draw.circle(surface, WHITE, (x - 3, y), 2)
+        pygame.draw.circle(surface, WHITE, (x + 3, y), 2)
+    else:
+        # Eyes, with pupils looking where the ghost is heading
+        look_x, look_y = direction if direction is not None else STOP
+        for eye_x in (x - 4, x + 4):
+            pygame.draw.circle(surface, WHITE, (eye_x, y - 2), 3)
+            pygame.draw.circle(surface, BLACK, (eye_x + look_x, y - 2 + look_y), 1)
+    return surface
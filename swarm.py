@@ -0,0 +1,174 @@
+"""
+Ghost swarm mode: one game with hundreds of ghosts.
+
+Every ghost's state lives in the NumPy arrays of a one-game BatchSimulation
+and all of them advance together in one vectorised pass per tick, with the
+same chase, scatter, random and frightened behaviour as Ghost. There are no
+per-ghost objects: SwarmSimulation offers the Simulation interface that Game
+plays through, and GhostSwarm draws the ghosts straight from the arrays.
+"""
+
+import random
+import numpy as np
+import pygame
+from config import *
+from maze import Maze
+from pacman import Pacman
+from sprites import ghost_sprite
+from batch_simulation import BatchSimulation, ACTIONS, GHOST_RADIUS
+from simulation import DEFAULT_PACMAN_START
+
+DEFAULT_SWARM_SIZE = 500
+
+
+class GhostSwarm:
+    """The ghosts of a swarm, drawn from the batch arrays"""
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.radius = GHOST_RADIUS
+
+    def __len__(self):
+        return self.batch.num_ghosts
+
+    def draw(self, screen, offset=(0, 0), view=None, shifts=None):
+        """Draw the ghosts whose centre is inside view (a world Rect; None draws all).
+
+        `shifts` are optional per-ghost (dx, dy) arrays added to the drawn positions.
+        """
+        batch = self.batch
+        x, y = batch.ghost_x[0], batch.ghost_y[0]
+        if view is None:
+            shown = np.arange(batch.num_ghosts)
+        else:
+            shown = np.flatnonzero((view.left < x) & (x < view.right) & (view.top < y) & (y < view.bottom))
+        if not len(shown):
+            return
+        x, y = x[shown], y[shown]
+        if shifts is not None:
+            x = x + shifts[0][shown]
+            y = y + shifts[1][shown]
+        states = np.where(batch.eaten[0, shown], GHOST_EATEN,
+                          np.where(batch.frightened[0, shown], GHOST_FRIGHTENED, GHOST_NORMAL))
+        # Same wave phase and placement as Ghost.draw
+        phases = (x + y).astype(np.int64) // 8 % 2
+        left = x.astype(np.int64) - (self.radius + 1 + offset[0])
+        top = y.astype(np.int64) - (self.radius + 3 + offset[1])
+
+        colors = batch.ghost_colors
+        radius = self.radius
+        screen.blits([(ghost_sprite(colors[g], radius, state, ACTIONS[direction], phase), (sx, sy))
+                      for g, state, direction, phase, sx, sy in zip(
+                          shown.tolist(), states.tolist(), batch.ghost_dir[0, shown].tolist(),
+                          phases.tolist(), left.tolist(), top.tolist())],
+                     doreturn=False)
+
+    def sprite_rects(self):
+        """World pixel areas covered by the drawn sprites, in ghost order"""
+        radius = self.radius
+        left = (self.batch.ghost_x[0].astype(np.int64) - radius - 1).tolist()
+        top = (self.batch.ghost_y[0].astype(np.int64) - radius - 3).tolist()
+        return [pygame.Rect(x, y, 2 * radius + 2, 2 * radius + 6) for x, y in zip(left, top)]
+
+
+class SwarmSimulation:
+    """A game of Simulation's rules with a ghost swarm, playable through Game.
+
+    Pacman and the maze are mirrored into ordinary Pacman and Maze objects
+    after each tick so the usual drawing code works. Snapshots, and so
+    replays, are not supported.
+    """
+
+    def __init__(self, seed=None, layout=None, num_ghosts=DEFAULT_SWARM_SIZE):
+        self.layout = layout
+        self.batch = BatchSimulation(1, num_ghosts=num_ghosts, layout=layout)
+        self.ghosts = GhostSwarm(self.batch)
+        self.pacman = None
+        self.profiler = None  # Game attaches its profiler; a tick shows up as its "update" phase
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Start a fresh game (a random seed is picked and kept if none is given)"""
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.batch.reset([seed])
+        self.pellets_eaten = 0
+        self._refill_maze()
+        self.pacman.reset()
+
+    def _refill_maze(self):
+        if self.pacman is None:
+            self.maze = Maze(self.layout)
+            start = self.maze.pacman_start or DEFAULT_PACMAN_START
+            self.pacman = Pacman(start[0], start[1], self.maze)
+        else:
+            self.maze.reset()
+
+    @property
+    def state(self):
+        return int(self.batch.state[0])
+
+    @state.setter
+    def state(self, value):
+        self.batch.state[0] = value
+
+    @property
+    def score(self):
+        return int(self.batch.score[0])
+
+    @property
+    def lives(self):
+        return int(self.batch.lives[0])
+
+    @property
+    def level(self):
+        return int(self.batch.level[0])
+
+    @property
+    def ticks(self):
+        return int(self.batch.ticks[0])
+
+    @property
+    def power_pellet_timer(self):
+        return int(self.batch.power_pellet_timer[0])
+
+    def step(self, action=None):
+        """Advance the world by one tick; same arguments and result as Simulation.step"""
+        if self.state != PLAYING:
+            return 0, self.state == GAME_OVER
+
+        level = self.level
+        _, rewards, dones = self.batch.step([-1 if action is None else ACTIONS.index(action)])
+        if self.level != level:
+            # The last pellet was eaten just before the maze refilled
+            self.pellets_eaten += self.maze.pellets_remaining
+            self._refill_maze()
+        else:
+            self._sync_pellets()
+        self._sync_pacman()
+        return int(rewards[0]), bool(dones[0])
+
+    def _sync_pellets(self):
+        """Take the pellets eaten this tick off the drawn maze"""
+        maze = self.maze
+        if maze.pellets_remaining == self.batch.pellets_remaining[0]:
+            return
+        changed = np.flatnonzero(np.frombuffer(maze.pellet_grid, dtype=np.uint8) != self.batch.pellets[0])
+        for index in changed.tolist():
+            x, y = index % maze.width, index // maze.width
+            maze.remove_pellet(x, y)
+            maze.remove_power_pellet(x, y)
+            self.pellets_eaten += 1
+
+    def _sync_pacman(self):
+        """Copy Pacman's position and facing from the arrays, and animate the mouth"""
+        batch = self.batch
+        pacman = self.pacman
+        pacman.pixel_x = batch.pacman_x[0].item()
+        pacman.pixel_y = batch.pacman_y[0].item()
+        pacman.grid_x = batch.pacman_grid_x[0].item()
+        pacman.grid_y = batch.pacman_grid_y[0].item()
+        pacman.direction = ACTIONS[batch.pacman_dir[0]]
+        pacman.next_direction = ACTIONS[batch.pacman_next[0]]
+        pacman.animate()